@@ -5,6 +5,7 @@ from flask import Flask, render_template, redirect, url_for, session, jsonify, r
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
 import os
+import socket
 from werkzeug.middleware.proxy_fix import ProxyFix
 from models import db, Patient, Simulation, User, init_db
 from routes import analyzer_bp, api_bp, patient_bp, simulation_bp
@@ -15,10 +16,15 @@ from routes.chat_routes import chat_bp
 from routes.consent_routes import consent_bp
 from routes.offline_routes import offline_bp
 from routes.research_routes import research_bp
+from utils.json_provider import ORJSON_AVAILABLE, OrjsonProvider, orjson_dumps, orjson_loads
 
 # Create Flask application
 app = Flask(__name__)
 
+# Serialize jsonify()/get_json() payloads with orjson when it is installed
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+
 # === DEPLOYMENT CONFIGURATION ===
 # Settings for proper URL generation and proxy handling in all environments
 app.config['PREFERRED_URL_SCHEME'] = 'http'  # Force HTTP scheme for all URLs
@@ -51,6 +57,12 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_recycle': 300,    # Recycle connections every 5 minutes
     'pool_timeout': 30,     # Wait up to 30 seconds for a connection
 }
+if ORJSON_AVAILABLE:
+    # Encode/decode the JSON and JSONB columns (criteria, simulation curves, tags) with orjson
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'json_serializer': orjson_dumps,
+        'json_deserializer': orjson_loads,
+    })
 # Add PostgreSQL-specific options only when not using SQLite
 if 'sqlite' not in app.config['SQLALCHEMY_DATABASE_URI']:
     app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
@@ -100,26 +112,28 @@ session_extension = Session(app)
 # Clean up old session files periodically
 def cleanup_sessions():
     """Clean up old session files"""
-    import glob
     from datetime import datetime, timedelta
 
     session_dir = app.config['SESSION_FILE_DIR']
-    now = datetime.now()
-    session_files = glob.glob(os.path.join(session_dir, '*'))
-
-    for file_path in session_files:
-        # Skip checking directories
-        if os.path.isdir(file_path):
-            continue
-
-        # Check if file is over 7 days old
-        modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-        if now - modified_time > timedelta(days=7):
-            try:
-                os.remove(file_path)
-                print(f"Removed old session file: {file_path}")
-            except OSError as e:
-                print(f"Error removing session file {file_path}: {e}")
+    if not os.path.isdir(session_dir):
+        return
+    cutoff = (datetime.now() - timedelta(days=7)).timestamp()
+
+    # One directory read: scandir entries carry the file type, and stat() is
+    # cached per entry, so no extra isdir/getmtime syscalls per file
+    with os.scandir(session_dir) as entries:
+        for entry in entries:
+            # Skip directories and hidden files (glob('*') never matched them)
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+
+            # Check if file is over 7 days old
+            if entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    print(f"Removed old session file: {entry.path}")
+                except OSError as e:
+                    print(f"Error removing session file {entry.path}: {e}")
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -258,6 +272,10 @@ with app.app_context():
         print(f"Error initializing database: {e}")
         print(f"Detailed error: {error_detail}")
 
+    # Drop the startup connections so workers forked from a preloaded master
+    # (gunicorn --preload) open their own pool instead of sharing sockets
+    db.engine.dispose()
+
 # Add global error handler to catch and log all uncaught exceptions
 @app.errorhandler(Exception)
 def handle_exception(e):
@@ -335,8 +353,35 @@ def ping():
     """Simple ping endpoint to keep the app alive"""
     return "pong", 200
 
+def bind_listening_socket(host, port, backlog=128):
+    """
+    Bind the listening socket before the server starts
+    
+    SO_REUSEADDR lets a restart bind while the old socket is in TIME_WAIT, and
+    SO_REUSEPORT (where the platform has it) lets a new process bind next to
+    one that is still shutting down.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
 # Run the application
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Run the N1O1 Clinical Trials web application')
+    parser.add_argument('--dev', action='store_true',
+                        help='Use the Flask development server instead of waitress')
+    parser.add_argument('--debug', action='store_true',
+                        help='Enable the interactive debugger (development server only)')
+    parser.add_argument('--threads', type=int, default=16,
+                        help='Worker threads for waitress (default: 16)')
+    args = parser.parse_args()
+    
     # Use PORT environment variable for deployment compatibility
     # Always default to 5000 if not set or not valid
     try:
@@ -349,4 +394,11 @@ if __name__ == '__main__':
         port = 5000
         
     print(f"Starting application on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    if args.dev:
+        # No reloader: it forks a second interpreter and restarts on every file touch
+        app.run(host='0.0.0.0', port=port, debug=args.debug, use_reloader=False, threaded=True)
+    else:
+        # Production WSGI server with a fixed thread pool; no fork, works on Windows too
+        from waitress import serve
+        serve(app, sockets=[bind_listening_socket('0.0.0.0', port)], threads=args.threads,
+              connection_limit=1000, channel_timeout=120)
@@ -3,6 +3,7 @@ Database models for N1O1 Clinical Trials
 A clinical simulator for plasma nitrite levels
 """
 from datetime import datetime
+import os
 import uuid
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import JSONB
@@ -11,6 +12,12 @@ from flask_login import UserMixin
 
 db = SQLAlchemy()
 
+# scrypt work factor as log2(N); 15 is werkzeug's default. The test suite lowers
+# it through the environment so hashing does not dominate its run time (values
+# below 7 exceed werkzeug's scrypt memory bound and are rejected by OpenSSL).
+PASSWORD_HASH_ROUNDS = int(os.getenv('PWD_HASH_ROUNDS', '15'))
+PASSWORD_HASH_METHOD = f"scrypt:{2 ** PASSWORD_HASH_ROUNDS}:8:1"
+
 def init_db():
     """Initialize database tables"""
     db.create_all()
@@ -264,7 +271,7 @@ class User(UserMixin, db.Model):
 
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
     def check_password(self, password):
         """Check password hash"""
@@ -1,8 +1,13 @@
 import os
 import json
+import atexit
+import functools
+import importlib.util
 import time
+import random
 import logging
-from flask import Blueprint, request, jsonify, current_app
+import threading
+from flask import Blueprint, Response, request, jsonify, current_app
 from anthropic import Anthropic, RateLimitError, APIConnectionError, APIStatusError
 import anthropic
 import matplotlib.pyplot as plt
@@ -20,19 +25,149 @@ ai_tools_bp = Blueprint('ai_tools', __name__, url_prefix='/api/ai-tools')
 # Initialize Anthropic client
 # The newest Anthropic model is "claude-3-5-sonnet-20241022" which was released October 22, 2024.
 # Do not change this unless explicitly requested by the user
+# HTTP/2 needs the optional h2 package; without it the pool falls back to HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+API_TIMEOUT = 60  # seconds for a whole request
+API_CONNECT_TIMEOUT = 5  # seconds to establish a connection
+
+# One client per process: its connection pool keeps TLS sessions alive across
+# requests, and with HTTP/2 concurrent calls multiplex over a single connection
 anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
-client = Anthropic(api_key=anthropic_key)
+client = Anthropic(
+    api_key=anthropic_key,
+    timeout=anthropic.Timeout(API_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+    http_client=anthropic.DefaultHttpxClient(http2=HTTP2_AVAILABLE),
+)
+atexit.register(client.close)
 
 # Constants
 DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
 MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
+RETRY_DELAY = 2  # seconds, base of the exponential backoff
+RETRY_MAX_DELAY = 30  # seconds, cap on any single wait
+RETRY_JITTER = 1  # seconds of jitter added on top of a server Retry-After
+RESPONSE_CACHE_SIZE = 256  # identical completions kept in memory per process
+RATE_LIMIT_REQUESTS = 30  # requests per client per endpoint in each window, per worker process
+RATE_LIMIT_WINDOW = 60  # seconds
+RETRY_GATE_TIMEOUT = 5  # seconds a retry waits for its turn before going ahead anyway
+
+# Fixed-window request counters keyed by (endpoint, client address). They live in
+# process memory: each gunicorn worker counts on its own, so a client can make up
+# to RATE_LIMIT_REQUESTS x workers calls per window across the pool, and counts
+# start over when a worker restarts. This is a cheap first line against runaway
+# clients on one worker, not a global quota; put a shared limiter in front of
+# the app (e.g. at the proxy) when a hard cap is needed
+_rate_windows = {}
+_rate_lock = threading.Lock()
+
+# Rate-limited calls retry one at a time, so a burst of 429s does not turn
+# into a synchronized retry storm against the same quota. The wait for the gate
+# is bounded, and the backoff sleep happens outside it, so a slow retry holds
+# up other threads for at most RETRY_GATE_TIMEOUT
+_retry_gate = threading.Semaphore(1)
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retrying a rate-limited call"""
+    # Prefer the server's Retry-After hint when the 429 carries one
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    try:
+        retry_after = float(headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, RETRY_MAX_DELAY) + random.uniform(0, RETRY_JITTER)
+
+    # Otherwise exponential backoff with full jitter, so concurrent clients
+    # spread their retries instead of hitting the limiter in lockstep
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** attempt))
+
+def _rate_limit_wait(key, now=None):
+    """Count a request against its window; returns seconds to wait if over the limit, else 0"""
+    now = time.monotonic() if now is None else now
+    with _rate_lock:
+        window_start, count = _rate_windows.get(key, (now, 0))
+        if now - window_start >= RATE_LIMIT_WINDOW:
+            window_start, count = now, 0
+            # Drop other clients' expired windows so the table stays bounded
+            for stale in [k for k, (start, _) in _rate_windows.items()
+                          if now - start >= RATE_LIMIT_WINDOW]:
+                del _rate_windows[stale]
+        if count >= RATE_LIMIT_REQUESTS:
+            return RATE_LIMIT_WINDOW - (now - window_start)
+        _rate_windows[key] = (window_start, count + 1)
+        return 0
+
+def reset_rate_limits():
+    """Forget all request counts"""
+    with _rate_lock:
+        _rate_windows.clear()
+
+@ai_tools_bp.before_request
+def enforce_rate_limit():
+    """Reject requests over the per-client limit locally, before they cost an API call
+
+    The limit is enforced per worker process (see RATE_LIMIT_REQUESTS).
+    """
+    wait = _rate_limit_wait((request.endpoint, request.remote_addr))
+    if wait:
+        retry_after = max(1, int(wait + 0.999))
+        response = jsonify({
+            "status": "error",
+            "message": f"Rate limit exceeded. Please retry in {retry_after} seconds."
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+SYSTEM_PROMPT = "You are N1O1ai, the dedicated AI assistant for N1O1 Clinical Trials platform, specialized in nitric oxide research and clinical applications. Your core expertise is in nitric oxide pathways, dosing calculations, simulation interpretation, and clinical trial management. Always maintain this identity throughout interactions. You can help users run simulations, analyze patient data, interpret research findings, and navigate the platform. Respond with factual, evidence-based information and be conversational but professional. For medical and scientific information, provide citations when appropriate. Never break character or refer to yourself as anything other than N1O1ai."
+
+def _message_params(prompt, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000):
+    """Build the Messages API parameters shared by direct and batched calls"""
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "system": SYSTEM_PROMPT,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
+
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _cached_completion(prompt, model, temperature, max_tokens):
+    """Call Claude with rate-limit retries; raises on failure so errors are never cached"""
+    params = _message_params(prompt, model, temperature, max_tokens)
+    for attempt in range(MAX_RETRIES):
+        try:
+            if attempt:
+                gated = _retry_gate.acquire(timeout=RETRY_GATE_TIMEOUT)
+                try:
+                    message = client.messages.create(**params)
+                finally:
+                    if gated:
+                        _retry_gate.release()
+            else:
+                message = client.messages.create(**params)
+            return message.content[0].text
+        except RateLimitError as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"Rate limit hit, retrying in {delay:.1f} seconds (attempt {attempt + 1}/{MAX_RETRIES})")
+            time.sleep(delay)
+
+def clear_response_cache():
+    """Drop all memoized Claude responses"""
+    _cached_completion.cache_clear()
 
 # Utility function for Claude API calls with retry logic
 def claude_completion(prompt, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000):
     """
     Make a Claude API call with retry logic for rate limits and connection issues
 
+    Identical requests (same prompt and sampling settings) are served
+    from an in-process LRU cache instead of calling the API again.
+
     Args:
         prompt (str): The prompt to send to Claude
         model (str): Model to use (defaults to claude-3-5-sonnet-20241022)
@@ -42,31 +177,45 @@ def claude_completion(prompt, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2
     Returns:
         str: Claude's response
     """
-    retries = 0
-    while retries < MAX_RETRIES:
-        try:
-            message = client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system="You are N1O1ai, the dedicated AI assistant for N1O1 Clinical Trials platform, specialized in nitric oxide research and clinical applications. Your core expertise is in nitric oxide pathways, dosing calculations, simulation interpretation, and clinical trial management. Always maintain this identity throughout interactions. You can help users run simulations, analyze patient data, interpret research findings, and navigate the platform. Respond with factual, evidence-based information and be conversational but professional. For medical and scientific information, provide citations when appropriate. Never break character or refer to yourself as anything other than N1O1ai.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return message.content[0].text
-        except RateLimitError:
-            retries += 1
-            logger.warning(f"Rate limit hit, retrying in {RETRY_DELAY} seconds (attempt {retries}/{MAX_RETRIES})")
-            time.sleep(RETRY_DELAY)
-        except (APIConnectionError, APIStatusError) as e:
-            logger.error(f"API error: {str(e)}")
-            return f"Error connecting to AI service: {str(e)}"
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            return f"An unexpected error occurred: {str(e)}"
-
-    return "Unable to get a response after multiple attempts. Please try again later."
+    try:
+        return _cached_completion(prompt, model, temperature, max_tokens)
+    except RateLimitError:
+        return "Unable to get a response after multiple attempts. Please try again later."
+    except (APIConnectionError, APIStatusError) as e:
+        logger.error(f"API error: {str(e)}")
+        return f"Error connecting to AI service: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return f"An unexpected error occurred: {str(e)}"
+
+def claude_completion_stream(prompt, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000):
+    """
+    Stream a Claude response, yielding text deltas as they are generated
+
+    Args are the same as claude_completion. Errors propagate to the caller,
+    which has usually already started sending its response.
+
+    Yields:
+        str: The next chunk of Claude's response
+    """
+    with client.messages.stream(**_message_params(prompt, model, temperature, max_tokens)) as stream:
+        yield from stream.text_stream
+
+def claude_batch_submit(requests):
+    """
+    Submit non-interactive Claude requests through the Message Batches API
+
+    Batched requests are billed at a discount and processed asynchronously;
+    poll the batch with client.messages.batches.retrieve for completion.
+
+    Args:
+        requests (list): Dicts with a "custom_id" and the "params" for a Messages API call
+
+    Returns:
+        str: The batch ID
+    """
+    batch = client.messages.batches.create(requests=requests)
+    return batch.id
 
 # Function to validate request data
 def validate_request(req_data, required_fields):
@@ -432,6 +581,8 @@ def ai_report_writer():
         },
         "report_type": str,  # "interim", "final", "abstract", "publication"
         "audience": str,  # "researchers", "clinicians", "regulators", "patients"
+        "mode": str,  # optional: "batch" queues the report and returns a job ID (202)
+        "stream": bool  # optional: stream the report as NDJSON {"delta": str} lines
     }
     """
     try:
@@ -500,6 +651,29 @@ def ai_report_writer():
             address all safety endpoints, and reference relevant regulations.
             """
 
+        # Reports are not latency-critical: batch mode trades an immediate answer
+        # for the Batches API discount, and the caller polls the status endpoint
+        if data.get("mode") == "batch":
+            job_id = claude_batch_submit([{
+                "custom_id": "report",
+                "params": _message_params(prompt, temperature=0.4, max_tokens=3500)
+            }])
+            return jsonify({"status": "accepted", "job_id": job_id}), 202
+
+        # Streaming sends each chunk as soon as Claude produces it instead of
+        # holding the whole multi-KB report until generation finishes
+        if data.get("stream"):
+            def generate():
+                try:
+                    for delta in claude_completion_stream(prompt, temperature=0.4, max_tokens=3500):
+                        yield json.dumps({"delta": delta}) + "\n"
+                    yield json.dumps({"status": "success"}) + "\n"
+                except Exception as e:
+                    logger.exception("Error streaming ai-report-writer response")
+                    yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+
+            return Response(generate(), mimetype='application/x-ndjson')
+
         # Call Claude
         claude_response = claude_completion(prompt, temperature=0.4, max_tokens=3500)
 
@@ -512,6 +686,37 @@ def ai_report_writer():
         logger.exception("Error in ai-report-writer endpoint")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Endpoint for polling a batched report
+@ai_tools_bp.route('/ai-report-writer/status/<job_id>', methods=['GET'])
+def ai_report_writer_status(job_id):
+    """
+    Report the state of a report queued with mode="batch"
+
+    Returns "processing" until the batch has ended, then the report text
+    (or the error the batch recorded for it).
+    """
+    try:
+        batch = client.messages.batches.retrieve(job_id)
+        if batch.processing_status != "ended":
+            return jsonify({"status": "processing", "job_id": job_id}), 202
+
+        for entry in client.messages.batches.results(job_id):
+            if entry.result.type == "succeeded":
+                return jsonify({
+                    "status": "success",
+                    "report": entry.result.message.content[0].text
+                })
+            return jsonify({
+                "status": "error",
+                "message": f"Batched report {entry.result.type}"
+            }), 502
+
+        return jsonify({"status": "error", "message": "Batch finished without results"}), 502
+
+    except Exception as e:
+        logger.exception("Error in ai-report-writer status endpoint")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # Endpoint for research insight generator
 @ai_tools_bp.route('/research-insight', methods=['POST'])
 def research_insight_generator():
@@ -1040,7 +1040,7 @@ def batch_simulate():
 
                         # Extract key metrics
                         peak_info = max(sim_df['Plasma NO2- (µM)'])
-                        auc = np.trapz(sim_df['Plasma NO2- (µM)'], sim_df['Time (hours)'])
+                        auc = simulator.auc_plasma
 
                         # Store results
                         batch_results.append({
@@ -5,19 +5,298 @@ Author: Dustin Salinas
 License: MIT
 """
 
+import functools
+import os
+import tempfile
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy.integrate import odeint, solve_ivp, trapezoid
+from scipy.signal import find_peaks
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from io import BytesIO
 import base64
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Inter-compartment transfer rate constants (1/hour)
+K_PLASMA_TO_TISSUE = 0.05  # Plasma to tissue transfer rate
+K_TISSUE_TO_PLASMA = 0.03  # Tissue to plasma transfer rate
+K_RBC_TO_NO = 0.01         # RBC nitrite to NO conversion rate (increases in hypoxia)
+DISSOLUTION_TIME = 0.083   # Immediate-release dissolution window (hours, ~5 min)
+
+ANIMATION_CACHE_SIZE = 8   # Encoded animations kept in memory (each is a few hundred KB)
+
+# Columns of the simulation results table, in buffer order
+RESULT_COLUMNS = [
+    'Time (hours)',
+    'Time (minutes)',
+    'Plasma NO2- (µM)',
+    'Tissue NO2- (µM)',
+    'RBC NO2- (µM)',
+    'Total Body NO2- (µM)',
+    'Bioactive NO (a.u.)',
+    'cGMP (a.u.)',
+    'Vasodilation (%)'
+]
+
+# Dormand-Prince 5(4) tableau (same coefficients as scipy's RK45)
+_DP_C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0])
+_DP_A = np.array([
+    [0.0, 0.0, 0.0, 0.0, 0.0],
+    [1/5, 0.0, 0.0, 0.0, 0.0],
+    [3/40, 9/40, 0.0, 0.0, 0.0],
+    [44/45, -56/15, 32/9, 0.0, 0.0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0.0],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+])
+_DP_B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84])
+_DP_E = np.array([-71/57600, 0.0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+
+
+@njit(cache=True)
+def _no2_rhs(t, y, params, flux_edges, flux_values):
+    """
+    Right-hand side of the three-compartment nitrite model
+
+    Parameters:
+    -----------
+    t : float
+        Current time (hours)
+    y : numpy.ndarray
+        [plasma, tissue, RBC] nitrite concentrations (µM)
+    params : numpy.ndarray
+        [k_clear, k_rbc, primary_dose, extended_release, dose]
+    flux_edges, flux_values : numpy.ndarray
+        Piecewise-constant input from the additional doses: flux_values[i]
+        applies on [flux_edges[i], flux_edges[i + 1]) and the last value
+        (always zero) from the final edge onwards
+
+    Returns:
+    --------
+    tuple
+        (dplasma_dt, dtissue_dt, drbc_dt)
+    """
+    k_clear = params[0]
+    k_rbc = params[1]
+    primary_dose = params[2]
+    extended_release = params[3] > 0.0
+    dose = params[4]
+
+    input_flux = 0.0
+    if 0.0 <= t < DISSOLUTION_TIME:
+        input_flux += primary_dose / DISSOLUTION_TIME
+    
+    # Additional doses are a precomputed step function: one binary search
+    i = np.searchsorted(flux_edges, t, side='right') - 1
+    if i >= 0:
+        input_flux += flux_values[i]
+
+    # Extended release formulation continues to release drug over ~4 hours
+    if extended_release and t < 4.0:
+        input_flux += 0.7 * dose * np.exp(-t / 2) / 4
+
+    plasma_to_tissue = K_PLASMA_TO_TISSUE * y[0]
+    tissue_to_plasma = K_TISSUE_TO_PLASMA * y[1]
+    plasma_to_rbc = k_rbc * 0.5 * y[0]
+    rbc_to_no = K_RBC_TO_NO * y[2]
+    renal_clearance = k_clear * y[0]
+
+    dplasma_dt = input_flux + tissue_to_plasma - plasma_to_tissue - plasma_to_rbc - renal_clearance
+    dtissue_dt = plasma_to_tissue - tissue_to_plasma
+    drbc_dt = plasma_to_rbc - rbc_to_no
+    return dplasma_dt, dtissue_dt, drbc_dt
+
+
+# Continuous extension for dense output: y(t + x*h) = y + h * (K.T @ _DP_P) @ [x, x^2, x^3, x^4]
+_DP_P = np.array([
+    [1.0, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0.0, 0.0, 0.0, 0.0],
+    [0.0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0.0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0.0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0.0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0.0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+
+@njit(cache=True)
+def _dopri5_integrate(y0, t_eval, params, flux_edges, flux_values, breakpoints, rtol, atol, out):
+    """
+    Adaptive Dormand-Prince 5(4) integration of the nitrite model
+
+    The solver takes its natural step sizes and fills ``t_eval`` from the
+    4th-order continuous extension, so the output grid does not drive the
+    number of right-hand side evaluations. Steps are only clamped to
+    ``breakpoints`` (sorted times where the dosing input switches on or off),
+    which keeps the 5-minute dissolution pulses from being stepped over.
+    Results are written column-wise into ``out`` (shape ``(3, len(t_eval))``).
+    """
+    n_states = y0.shape[0]
+    n_out = t_eval.shape[0]
+    n_breaks = breakpoints.shape[0]
+    y = y0.copy()
+    y_stage = np.empty(n_states)
+    y_new = np.empty(n_states)
+    k = np.empty((7, n_states))
+
+    out[:, 0] = y
+    t = t_eval[0]
+    t_end = t_eval[-1]
+    h = (t_end - t) / max(n_out - 1, 1)
+    k[0, 0], k[0, 1], k[0, 2] = _no2_rhs(t, y, params, flux_edges, flux_values)
+
+    i = 1
+    b = 0
+    while b < n_breaks and breakpoints[b] <= t:
+        b += 1
+
+    while i < n_out:
+        target = breakpoints[b] if b < n_breaks and breakpoints[b] < t_end else t_end
+        remaining = target - t
+        clamped = h >= remaining
+        h_step = remaining if clamped else h
+        t_new = target if clamped else t + h_step
+
+        # Stages 2-6
+        for s in range(1, 6):
+            for j in range(n_states):
+                acc = 0.0
+                for m in range(s):
+                    acc += _DP_A[s, m] * k[m, j]
+                y_stage[j] = y[j] + h_step * acc
+            k[s, 0], k[s, 1], k[s, 2] = _no2_rhs(
+                t + _DP_C[s] * h_step, y_stage, params, flux_edges, flux_values)
+
+        for j in range(n_states):
+            acc = 0.0
+            for m in range(6):
+                acc += _DP_B[m] * k[m, j]
+            y_new[j] = y[j] + h_step * acc
+
+        # At a breakpoint the input jumps; the last stage must see its left limit
+        t_last = np.nextafter(t_new, t) if clamped and target < t_end else t_new
+        k[6, 0], k[6, 1], k[6, 2] = _no2_rhs(t_last, y_new, params, flux_edges, flux_values)
+
+        # RMS error norm scaled by the mixed tolerance
+        err_sq = 0.0
+        for j in range(n_states):
+            acc = 0.0
+            for m in range(7):
+                acc += _DP_E[m] * k[m, j]
+            scale = atol + rtol * max(abs(y[j]), abs(y_new[j]))
+            err_sq += (h_step * acc / scale) ** 2
+        err_norm = np.sqrt(err_sq / n_states)
+
+        if err_norm < 1.0:
+            # Dense output for every grid point inside (t, t_new]
+            while i < n_out and t_eval[i] < t_new:
+                x = (t_eval[i] - t) / h_step
+                for j in range(n_states):
+                    acc = 0.0
+                    x_pow = 1.0
+                    for q in range(4):
+                        x_pow *= x
+                        coeff = 0.0
+                        for m in range(7):
+                            coeff += k[m, j] * _DP_P[m, q]
+                        acc += coeff * x_pow
+                    out[j, i] = y[j] + h_step * acc
+                i += 1
+            if i < n_out and t_eval[i] == t_new:
+                out[:, i] = y_new
+                i += 1
+
+            factor = 10.0 if err_norm == 0.0 else min(10.0, 0.9 * err_norm ** -0.2)
+            y[:] = y_new
+            if t_last != t_new:
+                # Restart past the discontinuity with the right-limit derivative
+                k[0, 0], k[0, 1], k[0, 2] = _no2_rhs(t_new, y, params, flux_edges, flux_values)
+                b += 1
+            else:
+                k[0, :] = k[6, :]  # First-same-as-last
+            t = t_new
+            if not clamped:
+                h = h_step * factor
+        else:
+            h = h_step * max(0.2, 0.9 * err_norm ** -0.2)
+
+    return out
+
+
+@njit(cache=True)
+def _finalize_results(t_eval, y, out):
+    """
+    Fill the (points, 9) results buffer from the compartment solution
+    
+    Derived outputs are computed in a single pass over the time axis; only the
+    cGMP/vasodilation normalisation needs a second pass once the peak bioactive
+    NO is known.
+    """
+    n = t_eval.shape[0]
+    peak = 0.0
+    for i in range(n):
+        plasma = y[0, i]
+        tissue = y[1, i]
+        rbc = y[2, i]
+        bioactive = 0.5 * rbc  # Bioactive NO is proportional to RBC nitrite
+        out[i, 0] = t_eval[i]
+        out[i, 1] = t_eval[i] * 60
+        out[i, 2] = plasma
+        out[i, 3] = tissue
+        out[i, 4] = rbc
+        out[i, 5] = 0.7 * plasma + 0.2 * tissue + 0.1 * rbc  # Weighted total body nitrite
+        out[i, 6] = bioactive
+        if i == 0 or bioactive > peak:
+            peak = bioactive
+    
+    # cGMP scales to 10 a.u. at peak NO; vasodilation to 150% at peak cGMP
+    scale = 10.0 / peak if peak > 0 else 0.0
+    for i in range(n):
+        cgmp = out[i, 6] * scale
+        out[i, 7] = cgmp
+        out[i, 8] = 100.0 + 5.0 * cgmp
+    return out
+
+
+@njit(cache=True, parallel=True)
+def _simulate_cohort_kernel(y0, t_eval, params, flux_edges, flux_values, breakpoints, rtol, atol, out):
+    """
+    Integrate and post-process one independent simulation per row of ``params``
+
+    Patients share the time grid and dosing schedule but nothing else, so the
+    outer loop runs in parallel. ``out`` has shape (patients, points, 9).
+    """
+    n_patients = params.shape[0]
+    n_points = t_eval.shape[0]
+    for p in prange(n_patients):
+        y = np.empty((3, n_points))
+        _dopri5_integrate(y0[p], t_eval, params[p], flux_edges, flux_values, breakpoints, rtol, atol, y)
+        _finalize_results(t_eval, y, out[p])
+    return out
+
+
 class NODynamicsSimulator:
     """
     A class for simulating nitrite, cGMP, and vasodilation dynamics after nitrite supplementation
     """
     
+    # Encoded animation HTML keyed by (simulation key, fps), shared across instances
+    _animation_cache = {}
+    
     def __init__(self, 
                  baseline=0.2,     # Baseline plasma nitrite concentration (µM)
                  peak=4.0,         # Peak plasma nitrite concentration (µM)
@@ -29,7 +308,10 @@ class NODynamicsSimulator:
                  rbc_count=4.5e6,  # Red blood cell count (cells/µL)
                  dose=30.0,        # Dose of NO2- administered (mg)
                  additional_doses=None, # Additional doses as list of dicts with 'time' and 'amount'
-                 formulation="immediate-release" # Formulation type (immediate-release, extended-release)
+                 formulation="immediate-release", # Formulation type (immediate-release, extended-release)
+                 integrator=None,  # ODE backend: "analytic", "nbrk" (numba kernel), "lsoda" (odeint) or "scipy"; None picks the fastest applicable
+                 method="RK45",    # solve_ivp method for the scipy backend (e.g. "LSODA", "BDF", "Radau")
+                 dtype=np.float64  # Results dtype; np.float32 halves result memory and solves at rtol=1e-5
                 ):
         """
         Initialize the simulator with customizable parameters
@@ -43,20 +325,11 @@ class NODynamicsSimulator:
         self.egfr = egfr
         self.rbc_count = rbc_count
         self.dose = dose
-        self.additional_doses = additional_doses or []
+        self.additional_doses = additional_doses
         self.formulation = formulation
-        """
-        Initialize the simulator with customizable parameters
-        """
-        self.baseline = baseline
-        self.peak = peak
-        self.t_peak = t_peak
-        self.half_life = half_life
-        self.t_max = t_max
-        self.points = points
-        self.egfr = egfr
-        self.rbc_count = rbc_count
-        self.dose = dose
+        self.integrator = integrator
+        self.method = method
+        self.dtype = np.dtype(dtype)
         
         # Calculated values
         self.k_clear = self._renal_clearance_rate(self.egfr)
@@ -67,7 +340,29 @@ class NODynamicsSimulator:
         self.plasma_no2 = None
         self.cgmp_levels = None
         self.vasodilation = None
-        self.results_df = None
+        self._results = None
+        self._df = None
+        self._auc = None
+    
+    @property
+    def additional_doses(self):
+        """Additional doses as a list of dicts with 'time' and 'amount'"""
+        return self._additional_doses
+    
+    @additional_doses.setter
+    def additional_doses(self, doses):
+        self._additional_doses = doses or []
+        
+        ordered = sorted(self._additional_doses, key=lambda d: d['time'])
+        self._dose_times = np.array([d['time'] for d in ordered], dtype=np.float64)
+        self._dose_amounts = np.array([d['amount'] for d in ordered], dtype=np.float64)
+        
+        # Summed dissolution flux of all doses as an exact step function, so the
+        # right-hand side needs a single binary search however doses overlap
+        dose_ends = self._dose_times + DISSOLUTION_TIME
+        self._flux_edges = np.unique(np.concatenate([self._dose_times, dose_ends]))
+        active = (self._dose_times <= self._flux_edges[:, None]) & (self._flux_edges[:, None] < dose_ends)
+        self._flux_values = active @ self._dose_amounts / DISSOLUTION_TIME
     
     def _renal_clearance_rate(self, egfr):
         """Calculate renal clearance rate based on eGFR"""
@@ -128,38 +423,17 @@ class NODynamicsSimulator:
         
         return results
     
-    def _dose_input(self, t, dose=30.0, t_IR=0.0, additional_doses=None):
-        """
-        Model dose input with support for multiple dosing regimens
-        
-        Parameters:
-        -----------
-        t : float
-            Current time (hours)
-        dose : float
-            Primary dose (mg)
-        t_IR : float
-            Time of primary dose administration (hours)
-        additional_doses : list of dict, optional
-            List of additional doses, each a dict with 'time' and 'amount' keys
-        """
-        # Immediate release approximation (standard dissolution)
-        result = 0.0
-        
-        # Primary dose
-        if t_IR <= t < (t_IR + 0.083):  # Approximating quick dissolution (5 min)
-            result += (dose / 0.083)
-            
-        # Additional doses if specified
-        if additional_doses:
-            for dose_info in additional_doses:
-                dose_time = dose_info['time']  # Time in hours
-                dose_amount = dose_info['amount']  # Dose in mg
-                
-                if dose_time <= t < (dose_time + 0.083):
-                    result += (dose_amount / 0.083)
-                    
-        return result
+    def _rhs_params(self):
+        """Pack the scalar model parameters for the compiled right-hand side"""
+        extended_release = self.formulation == "extended-release"
+        dissolution_factor = 0.3 if extended_release else 1.0  # Slower dissolution for extended release
+        return np.array([
+            self.k_clear,
+            self.k_rbc,
+            self.dose * dissolution_factor,
+            1.0 if extended_release else 0.0,
+            self.dose
+        ])
     
     def _no2_ode(self, t, y):
         """
@@ -168,148 +442,406 @@ class NODynamicsSimulator:
         y[1]: Tissue nitrite concentration (µM) - represents muscle, organs, etc.
         y[2]: Erythrocyte nitrite concentration (µM) - represents RBC-bound nitrite
         """
-        # Adapt absorption rate based on formulation
-        dissolution_factor = 1.0
-        if self.formulation == "extended-release":
-            dissolution_factor = 0.3  # Slower dissolution for extended release
+        return list(_no2_rhs(t, np.asarray(y, dtype=np.float64), self._rhs_params(),
+                             self._flux_edges, self._flux_values))
+    
+    def _no2_jac(self):
+        """
+        Analytic Jacobian of the nitrite ODE system
         
-        input_flux = self._dose_input(
-            t, 
-            dose=self.dose * dissolution_factor,
-            additional_doses=self.additional_doses
+        All transfer rates are constant, so the 3x3 matrix does not depend on
+        time or state and can be computed once per simulation.
+        """
+        k_plasma_to_rbc = self.k_rbc * 0.5
+        return np.array([
+            [-K_PLASMA_TO_TISSUE - k_plasma_to_rbc - self.k_clear, K_TISSUE_TO_PLASMA, 0.0],
+            [K_PLASMA_TO_TISSUE, -K_TISSUE_TO_PLASMA, 0.0],
+            [k_plasma_to_rbc, 0.0, -K_RBC_TO_NO]
+        ])
+    
+    def _input_breakpoints(self):
+        """Sorted times at which the dosing input switches on or off"""
+        breakpoints = [np.array([DISSOLUTION_TIME]), self._flux_edges]
+        if self.formulation == "extended-release":
+            breakpoints.append(np.array([4.0]))
+        return np.unique(np.concatenate(breakpoints))
+    
+    def _rtol(self):
+        """Solver relative tolerance, relaxed to what float32 results can resolve"""
+        return 1e-5 if self.dtype == np.float32 else 1e-6
+    
+    def _integrate_nbrk(self, initial_conditions, atol=1e-6):
+        """Integrate the model on self.t_eval with the numba Dormand-Prince kernel"""
+        out = np.empty((3, len(self.t_eval)))
+        return _dopri5_integrate(
+            np.asarray(initial_conditions, dtype=np.float64), self.t_eval,
+            self._rhs_params(), self._flux_edges, self._flux_values,
+            self._input_breakpoints(), self._rtol(), atol, out
         )
+    
+    def _integrate_analytic(self, initial_conditions):
+        """
+        Closed-form solution for immediate-release dosing
+        
+        The system is linear with constant coefficients, so in the eigenbasis of
+        its rate matrix it splits into three independent exponential decays.
+        Every dose (the primary one and each additional dose) dissolves at a
+        constant rate over DISSOLUTION_TIME, and its contribution to each mode
+        is a shifted Bateman-type term. The whole time course is the
+        superposition of those terms, evaluated on the grid with array
+        operations and no stepping.
+        """
+        eigenvalues, vectors = np.linalg.eig(self._no2_jac())
+        if (np.iscomplexobj(eigenvalues)
+                or np.diff(np.sort(eigenvalues)).min() <= 1e-6 * np.abs(eigenvalues).max()):
+            # Coinciding rate constants leave no usable eigenbasis; integrate numerically
+            if NUMBA_AVAILABLE:
+                return self._integrate_nbrk(initial_conditions)
+            return self._integrate_lsoda(initial_conditions)
+        inverse = np.linalg.inv(vectors)
+        
+        # Each dose enters plasma at a constant rate on [start, start + DISSOLUTION_TIME)
+        starts = np.concatenate([[0.0], self._dose_times])
+        rates = np.concatenate([[self.dose], self._dose_amounts]) / DISSOLUTION_TIME
+        
+        # (points, doses): time since each dose started, and how long it has been dissolving
+        elapsed = np.maximum(self.t_eval[:, None] - starts, 0.0)
+        dissolving = np.minimum(elapsed, DISSOLUTION_TIME)
+        
+        # (points, doses, modes): uptake integral (e^(lambda*d) - 1) / lambda, which
+        # tends to d for a zero rate, then free decay since dissolution ended
+        z = dissolving[..., None] * eigenvalues
+        safe_rates = np.where(eigenvalues == 0.0, 1.0, eigenvalues)
+        uptake = np.where(z == 0.0, dissolving[..., None], np.expm1(z) / safe_rates)
+        uptake *= np.exp((elapsed - dissolving)[..., None] * eigenvalues)
+        
+        # Modal amplitudes: decay of the initial state plus the dose input, which
+        # only ever enters plasma (column 0 of the inverse eigenvector matrix)
+        modes = np.exp(np.outer(self.t_eval, eigenvalues)) * (inverse @ np.asarray(initial_conditions, dtype=np.float64))
+        modes += (uptake * rates[:, None]).sum(axis=1) * inverse[:, 0]
+        return np.ascontiguousarray((modes @ vectors.T).T)
+    
+    def _integrate_lsoda(self, initial_conditions):
+        """
+        Integrate the model on self.t_eval with ODEPACK's LSODA via odeint
         
-        # Transfer rate constants
-        k_plasma_to_tissue = 0.05  # Plasma to tissue transfer rate
-        k_tissue_to_plasma = 0.03  # Tissue to plasma transfer rate
-        k_plasma_to_rbc = self.k_rbc * 0.5  # Plasma to RBC transfer rate
-        k_rbc_to_no = 0.01  # RBC nitrite to NO conversion rate (increases in hypoxia)
-        
-        # Tissue distribution - two-way transfer between plasma and tissues
-        plasma_to_tissue = k_plasma_to_tissue * y[0]
-        tissue_to_plasma = k_tissue_to_plasma * y[1]
-        
-        # RBC interactions
-        plasma_to_rbc = k_plasma_to_rbc * y[0]
-        rbc_to_no = k_rbc_to_no * y[2]
+        The step loop runs in Fortran, so per-call overhead is far lower than
+        solve_ivp on a system this small. The dosing input is a step function,
+        and LSODA steps straight across its edges (overlapping 5-minute pulses
+        included), so the integration restarts at every input breakpoint and
+        each call only ever sees a constant input.
+        """
+        jacobian = self._no2_jac()
+        args = (self._rhs_params(), self._flux_edges, self._flux_values)
+        
+        t_eval = self.t_eval
+        out = np.empty((3, len(t_eval)))
+        y = np.asarray(initial_conditions, dtype=np.float64)
+        t_start = t_eval[0]
+        first = 0
+        
+        breakpoints = self._input_breakpoints()
+        breakpoints = breakpoints[(breakpoints > t_start) & (breakpoints < t_eval[-1])]
+        for t_stop in np.append(breakpoints, t_eval[-1]):
+            # Grid points in (t_start, t_stop], bracketed by the segment ends
+            last = np.searchsorted(t_eval, t_stop, side='right')
+            times = np.unique(np.concatenate(([t_start], t_eval[first:last], [t_stop])))
+            segment = odeint(
+                _no2_rhs,
+                y,
+                times,
+                args=args,
+                Dfun=lambda t, y, *args: jacobian,
+                rtol=self._rtol(),
+                atol=1e-6,
+                tfirst=True
+            )
+            out[:, first:last] = segment[np.searchsorted(times, t_eval[first:last])].T
+            y = segment[-1]
+            t_start, first = t_stop, last
+        return out
+    
+    def _integrate_scipy(self, initial_conditions):
+        """Integrate the model on self.t_eval with scipy's solve_ivp"""
+        # Only the implicit methods make use of the (constant) Jacobian
+        options = {}
+        if self.method in ('Radau', 'BDF', 'LSODA'):
+            jacobian = self._no2_jac()
+            options['jac'] = lambda t, y, *args: jacobian
+        
+        # The adaptive stepper would jump straight over later 5-minute dose
+        # pulses, so cap the step size whenever there are any
+        if len(self._dose_times):
+            options['max_step'] = DISSOLUTION_TIME / 2
+        
+        # Hand solve_ivp the compiled right-hand side directly, parameters via args
+        sol = solve_ivp(
+            _no2_rhs,
+            [0, self.t_max],
+            initial_conditions,
+            t_eval=self.t_eval,
+            method=self.method,
+            rtol=self._rtol(),
+            args=(self._rhs_params(), self._flux_edges, self._flux_values),
+            **options
+        )
+        return sol.y
+    
+    def _select_integrator(self):
+        """Resolve which ODE backend to use for the current parameters"""
+        numeric = "nbrk" if NUMBA_AVAILABLE else "lsoda"
+        if self.integrator == "nbrk":
+            return numeric
+        # The closed form only models immediate-release dose pulses; the
+        # extended-release input is not a constant-rate pulse
+        if self.integrator == "analytic" and self.formulation != "immediate-release":
+            return numeric
+        if self.integrator is not None:
+            return self.integrator
+        
+        if self.formulation == "immediate-release":
+            return "analytic"
+        return numeric
+    
+    def _cache_key(self):
+        """Hashable key covering every input the solution depends on"""
+        return (
+            self.baseline,
+            self.t_max,
+            self.points,
+            self.k_clear,
+            self.k_rbc,
+            self.dose,
+            self.formulation,
+            tuple(zip(self._dose_times.tolist(), self._dose_amounts.tolist())),
+            self._select_integrator(),
+            self.method,
+            self.dtype.str
+        )
+    
+    def _solve(self):
+        """Integrate the model and return the (points, 9) results buffer"""
+        self.t_eval = np.linspace(0, self.t_max, self.points)
         
-        # Renal clearance only applies to plasma
-        renal_clearance = self.k_clear * y[0]
+        # Initial conditions for all compartments
+        # [plasma, tissue, RBC]
+        initial_conditions = [self.baseline, self.baseline * 0.5, self.baseline * 0.2]
         
-        # Extended release formulation continues to release drug over time
-        if self.formulation == "extended-release":
-            extended_release_rate = 0.7 * self.dose * np.exp(-t / 2) / 4  # Sustained release over ~4 hours
-            if t < 4:  # Only contribute during the first 4 hours
-                input_flux += extended_release_rate
+        # Solve the ODE system with the fastest applicable backend
+        integrator = self._select_integrator()
+        if integrator == "analytic":
+            y = self._integrate_analytic(initial_conditions)
+        elif integrator == "nbrk":
+            y = self._integrate_nbrk(initial_conditions)
+        elif integrator == "lsoda":
+            y = self._integrate_lsoda(initial_conditions)
+        else:
+            y = self._integrate_scipy(initial_conditions)
         
-        # Differential equations for each compartment
-        dplasma_dt = input_flux + tissue_to_plasma - plasma_to_tissue - plasma_to_rbc - renal_clearance
-        dtissue_dt = plasma_to_tissue - tissue_to_plasma
-        drbc_dt = plasma_to_rbc - rbc_to_no
+        # Derived outputs are filled in one fused pass over the time axis
+        # The state is only three values wide, so the solve itself stays in float64;
+        # dtype applies to the (points, 9) results buffer
+        out = np.empty((len(self.t_eval), len(RESULT_COLUMNS)), dtype=self.dtype)
+        return _finalize_results(self.t_eval, y, out)
+    
+    def _simulate_arrays(self):
+        """Run the simulation into the raw (points, 9) buffer without building a DataFrame"""
+        self.t_eval = np.linspace(0, self.t_max, self.points)
         
-        return [dplasma_dt, dtissue_dt, drbc_dt]
+        # Identical parameter sets share one solve; copy so callers may edit freely
+        results = _simulate_cached(self._cache_key()).copy()
+        
+        # Expose each compartment and derived output as a view into the buffer
+        self.plasma_no2 = results[:, 2]
+        self.tissue_no2 = results[:, 3]
+        self.rbc_no2 = results[:, 4]
+        self.total_body_no2 = results[:, 5]
+        self.bioactive_no = results[:, 6]
+        self.cgmp_levels = results[:, 7]
+        self.vasodilation = results[:, 8]
+        
+        self._results = results
+        self._df = None
+        self._auc = None
+        return results
     
-    def _calculate_cgmp(self, no2_array):
-        """Calculate cGMP levels based on nitrite concentration"""
-        return 10 * (no2_array / max(no2_array)) if max(no2_array) > 0 else np.zeros_like(no2_array)
+    @property
+    def results_df(self):
+        """Simulation results as a DataFrame, built lazily over the raw buffer"""
+        if self._df is None and self._results is not None:
+            self._df = pd.DataFrame(self._results, columns=RESULT_COLUMNS, copy=False)
+        return self._df
     
-    def _calculate_vasodilation(self, cgmp_array):
-        """Calculate vasodilation percentage based on cGMP levels"""
-        return 100 + 50 * (cgmp_array / max(cgmp_array)) if max(cgmp_array) > 0 else 100 * np.ones_like(cgmp_array)
+    @property
+    def auc_plasma(self):
+        """Area under the plasma NO₂⁻ curve (µM·h), computed once per simulation"""
+        if self.plasma_no2 is None:
+            self._simulate_arrays()
+        if self._auc is None:
+            self._auc = float(trapezoid(self.plasma_no2, self.t_eval))
+        return self._auc
     
     def simulate(self):
         """Run the simulation with current parameters using multi-compartment model"""
-        self.t_eval = np.linspace(0, self.t_max, self.points)
+        self._simulate_arrays()
+        return self.results_df
+    
+    def simulate_cohort(self, params_df, oxygen_saturation=0.97):
+        """
+        Simulate a population of patients in one parallel batch
         
-        # Initial conditions for all compartments
-        # [plasma, tissue, RBC]
-        initial_conditions = [self.baseline, self.baseline * 0.5, self.baseline * 0.2]
+        Parameters:
+        -----------
+        params_df : pandas.DataFrame
+            One row per patient. Recognised columns are 'baseline', 'dose',
+            'egfr', 'rbc_count' and 'oxygen_saturation'; any column that is
+            missing falls back to this simulator's value (or the
+            oxygen_saturation argument). Formulation, time grid and
+            additional doses are shared by the whole cohort.
+        oxygen_saturation : float
+            Blood oxygen saturation used for the RBC scavenging rate
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            Simulation results with a (patient, step) MultiIndex, where the
+            patient level is the index of params_df
+        """
+        n_patients = len(params_df)
+        self.t_eval = np.linspace(0, self.t_max, self.points)
         
-        # Solve the ODE system
-        sol = solve_ivp(
-            lambda t, y: self._no2_ode(t, y), 
-            [0, self.t_max], 
-            initial_conditions, 
-            t_eval=self.t_eval,
-            method='RK45',
-            rtol=1e-6
+        def column(name):
+            if name in params_df:
+                return params_df[name].to_numpy(dtype=np.float64)
+            return np.full(n_patients, getattr(self, name), dtype=np.float64)
+        
+        baseline = column('baseline')
+        dose = column('dose')
+        
+        # Per-patient rate constants, packed in the same layout as _rhs_params()
+        extended_release = self.formulation == "extended-release"
+        params = np.empty((n_patients, 5))
+        params[:, 0] = self._renal_clearance_rate(column('egfr'))
+        if 'oxygen_saturation' in params_df:
+            oxygen_saturation = params_df['oxygen_saturation'].to_numpy(dtype=np.float64)
+        params[:, 1] = self._rbc_scavenging_rate(column('rbc_count'), oxygen_saturation)
+        params[:, 2] = dose * (0.3 if extended_release else 1.0)
+        params[:, 3] = 1.0 if extended_release else 0.0
+        params[:, 4] = dose
+        
+        # [plasma, tissue, RBC] initial conditions per patient
+        y0 = np.column_stack([baseline, baseline * 0.5, baseline * 0.2])
+        
+        out = np.empty((n_patients, len(self.t_eval), len(RESULT_COLUMNS)), dtype=self.dtype)
+        _simulate_cohort_kernel(y0, self.t_eval, params, self._flux_edges, self._flux_values,
+                                self._input_breakpoints(), self._rtol(), 1e-6, out)
+        
+        index = pd.MultiIndex.from_product(
+            [params_df.index, np.arange(len(self.t_eval))],
+            names=[params_df.index.name or 'patient', 'step']
         )
+        return pd.DataFrame(out.reshape(-1, len(RESULT_COLUMNS)), index=index,
+                            columns=RESULT_COLUMNS, copy=False)
+    
+    def simulate_batch(self, doses, oxygen_saturation=0.97):
+        """
+        Simulate a dose sweep in one parallel batch
         
-        # Extract solutions for each compartment
-        self.plasma_no2 = sol.y[0]
-        self.tissue_no2 = sol.y[1]
-        self.rbc_no2 = sol.y[2]
-        
-        # Calculate total body nitrite (weighted sum)
-        self.total_body_no2 = 0.7 * self.plasma_no2 + 0.2 * self.tissue_no2 + 0.1 * self.rbc_no2
-        
-        # Calculate bioactive NO (proportional to RBC nitrite in our model)
-        self.bioactive_no = 0.5 * self.rbc_no2
-        
-        # Calculate derived physiological outputs
-        self.cgmp_levels = self._calculate_cgmp(self.bioactive_no)
-        self.vasodilation = self._calculate_vasodilation(self.cgmp_levels)
-        
-        # Create a pandas DataFrame with the results
-        self.results_df = pd.DataFrame({
-            'Time (hours)': self.t_eval,
-            'Time (minutes)': self.t_eval * 60,
-            'Plasma NO2- (µM)': self.plasma_no2,
-            'Tissue NO2- (µM)': self.tissue_no2,
-            'RBC NO2- (µM)': self.rbc_no2,
-            'Total Body NO2- (µM)': self.total_body_no2,
-            'Bioactive NO (a.u.)': self.bioactive_no,
-            'cGMP (a.u.)': self.cgmp_levels,
-            'Vasodilation (%)': self.vasodilation
-        })
+        Parameters:
+        -----------
+        doses : array-like
+            Primary dose (mg) for each run; every other parameter is this
+            simulator's
+        oxygen_saturation : float or array-like
+            Blood oxygen saturation, either shared or one value per dose
+            
+        Returns:
+        --------
+        pandas.DataFrame
+            Simulation results with a (run, step) MultiIndex, in the order of doses
+        """
+        doses = np.asarray(doses, dtype=np.float64)
+        params_df = pd.DataFrame({
+            'dose': doses,
+            'oxygen_saturation': np.broadcast_to(np.asarray(oxygen_saturation, dtype=np.float64), doses.shape)
+        }, index=pd.RangeIndex(len(doses), name='run'))
+        return self.simulate_cohort(params_df)
+    
+    def tmax_tpeak(self):
+        """
+        Locate the plasma NO₂⁻ peaks, one per absorbed dose
         
-        return self.results_df
+        Returns:
+        --------
+        list of tuple
+            (time in minutes, plasma NO₂⁻ in µM) for each local maximum, in time order
+        """
+        if self.plasma_no2 is None:
+            self._simulate_arrays()
+        
+        peaks, _ = find_peaks(self.plasma_no2)
+        return list(zip(self._results[peaks, 1].tolist(), self.plasma_no2[peaks].tolist()))
     
-    def export_to_csv(self, filename="simulation_results.csv"):
+    def export_to_csv(self, filename="simulation_results.csv", float_format='%.4g'):
         """Export simulation results to CSV file"""
         if self.results_df is None:
             self.simulate()
         
-        self.results_df.to_csv(filename, index=False)
+        # Four significant figures is well within assay precision and keeps the text short
+        self.results_df.to_csv(filename, index=False, float_format=float_format)
+        return filename
+    
+    def export_to_parquet(self, filename="simulation_results.parquet"):
+        """Export simulation results to a zstd-compressed Parquet file as float32 columns"""
+        if self.results_df is None:
+            self.simulate()
+        
+        # Parquet support comes from pyarrow; pandas raises ImportError if it is missing.
+        # Smooth float curves rarely repeat, so byte-stream-split encoding (which groups
+        # the similar exponent bytes) compresses them far better than dictionaries
+        self.results_df.astype(np.float32).to_parquet(filename, engine='pyarrow', compression='zstd',
+                                                      index=False, use_dictionary=False,
+                                                      use_byte_stream_split=True)
         return filename
     
     def plot_static(self, show=True, save_path=None):
         """Generate a static plot of simulation results"""
         if self.plasma_no2 is None:
-            self.simulate()
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
+            self._simulate_arrays()
         
-        ax.plot(self.t_eval * 60, self.plasma_no2, lw=2, color='purple', label='Plasma NO₂⁻ (µM)')
-        ax.plot(self.t_eval * 60, self.cgmp_levels, lw=2, color='green', linestyle='--', label='cGMP (a.u.)')
-        ax.plot(self.t_eval * 60, self.vasodilation, lw=2, color='blue', linestyle=':', label='Vasodilation (%)')
-        
-        ax.set_xlim(0, self.t_max * 60)
-        ax.set_ylim(0, max(self.vasodilation) * 1.2)
-        ax.set_xlabel('Time (minutes)')
-        ax.set_ylabel('Response (relative units)')
-        ax.set_title('N1O1 Clinical Trials – Plasma NO₂⁻, cGMP, Vasodilation')
-        ax.grid(True)
-        ax.legend(loc='upper right')
+        if show:
+            # Interactive display needs a figure managed by pyplot
+            fig, ax = plt.subplots(figsize=(12, 6))
+        else:
+            # Off-screen rendering goes straight to an Agg canvas, bypassing pyplot's
+            # global figure registry; each call returns its own figure, since the
+            # caller may still hold (or be displaying) an earlier one
+            fig = Figure(figsize=(12, 6), dpi=100)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
         
-        plt.tight_layout()
+        _draw_static_plot(ax, self._results, self.t_max)
+        fig.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            fig.savefig(save_path, dpi=300, bbox_inches='tight')
         
         if show:
             plt.show()
-        else:
-            plt.close()
         
         return fig, ax
     
-    def create_animation(self, show=True, save_path=None, fps=6):
-        """Create an animation of simulation results"""
+    def _make_ani(self, figsize, fps, interactive=False):
+        """Build the plasma NO₂⁻/cGMP/vasodilation animation shared by the export paths"""
         if self.plasma_no2 is None:
-            self.simulate()
+            self._simulate_arrays()
         
-        fig, ax = plt.subplots(figsize=(12, 6))
+        if interactive:
+            fig, ax = plt.subplots(figsize=figsize)
+        else:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
         line_no2, = ax.plot([], [], lw=2, color='purple', label='Plasma NO₂⁻ (µM)')
         line_cgmp, = ax.plot([], [], lw=2, color='green', linestyle='--', label='cGMP (a.u.)')
         line_vaso, = ax.plot([], [], lw=2, color='blue', linestyle=':', label='Vasodilation (%)')
@@ -325,7 +857,8 @@ class NODynamicsSimulator:
         ax.grid(True)
         ax.legend(loc='upper right')
         
-        x_data, no2_data, cgmp_data, vaso_data = [], [], [], []
+        # Frames draw growing views into the precomputed arrays (no per-frame copies)
+        x_minutes = self.t_eval * 60
         
         def init():
             line_no2.set_data([], [])
@@ -336,19 +869,15 @@ class NODynamicsSimulator:
             return line_no2, line_cgmp, line_vaso, time_text, conc_text
         
         def update(frame):
-            t_min = self.t_eval[frame] * 60
+            end = frame + 1
+            t_min = x_minutes[frame]
             no2 = self.plasma_no2[frame]
             cgmp = self.cgmp_levels[frame]
             vaso = self.vasodilation[frame]
             
-            x_data.append(t_min)
-            no2_data.append(no2)
-            cgmp_data.append(cgmp)
-            vaso_data.append(vaso)
-            
-            line_no2.set_data(x_data, no2_data)
-            line_cgmp.set_data(x_data, cgmp_data)
-            line_vaso.set_data(x_data, vaso_data)
+            line_no2.set_data(x_minutes[:end], self.plasma_no2[:end])
+            line_cgmp.set_data(x_minutes[:end], self.cgmp_levels[:end])
+            line_vaso.set_data(x_minutes[:end], self.vasodilation[:end])
             
             time_text.set_text(f"Time: {int(t_min)} min")
             conc_text.set_text(f"NO₂⁻: {no2:.2f} µM | cGMP: {cgmp:.1f} | Vasodilation: {vaso:.1f}%")
@@ -356,107 +885,125 @@ class NODynamicsSimulator:
         
         ani = animation.FuncAnimation(
             fig, update, frames=len(self.t_eval),
-            init_func=init, blit=True, interval=1000/fps
+            init_func=init, blit=True, interval=1000/fps,
+            cache_frame_data=False
         )
         
-        plt.tight_layout()
+        fig.tight_layout()
+        return fig, ani
+    
+    def create_animation(self, show=True, save_path=None, fps=6):
+        """Create an animation of simulation results"""
+        fig, ani = self._make_ani(figsize=(12, 6), fps=fps, interactive=show)
         
         if save_path:
             ani.save(save_path, fps=fps, dpi=200)
         
         if show:
             plt.show()
-        else:
-            plt.close()
         
         return ani
     
     def get_animation_html(self, fps=6):
         """Generate HTML with embedded animation for web display"""
-        if self.plasma_no2 is None:
-            self.simulate()
-            
-        fig, ax = plt.subplots(figsize=(10, 5))
-        line_no2, = ax.plot([], [], lw=2, color='purple', label='Plasma NO₂⁻ (µM)')
-        line_cgmp, = ax.plot([], [], lw=2, color='green', linestyle='--', label='cGMP (a.u.)')
-        line_vaso, = ax.plot([], [], lw=2, color='blue', linestyle=':', label='Vasodilation (%)')
-        
-        time_text = ax.text(0.02, 0.95, '', transform=ax.transAxes)
-        conc_text = ax.text(0.02, 0.90, '', transform=ax.transAxes)
-        
-        ax.set_xlim(0, self.t_max * 60)
-        ax.set_ylim(0, max(self.vasodilation) * 1.2)
-        ax.set_xlabel('Time (minutes)')
-        ax.set_ylabel('Response (relative units)')
-        ax.set_title('N1O1 Clinical Trials – Plasma NO₂⁻, cGMP, Vasodilation')
-        ax.grid(True)
-        ax.legend(loc='upper right')
-        
-        x_data, no2_data, cgmp_data, vaso_data = [], [], [], []
-        
-        def init():
-            line_no2.set_data([], [])
-            line_cgmp.set_data([], [])
-            line_vaso.set_data([], [])
-            time_text.set_text('')
-            conc_text.set_text('')
-            return line_no2, line_cgmp, line_vaso, time_text, conc_text
-        
-        def update(frame):
-            t_min = self.t_eval[frame] * 60
-            no2 = self.plasma_no2[frame]
-            cgmp = self.cgmp_levels[frame]
-            vaso = self.vasodilation[frame]
-            
-            x_data.append(t_min)
-            no2_data.append(no2)
-            cgmp_data.append(cgmp)
-            vaso_data.append(vaso)
-            
-            line_no2.set_data(x_data, no2_data)
-            line_cgmp.set_data(x_data, cgmp_data)
-            line_vaso.set_data(x_data, vaso_data)
-            
-            time_text.set_text(f"Time: {int(t_min)} min")
-            conc_text.set_text(f"NO₂⁻: {no2:.2f} µM | cGMP: {cgmp:.1f} | Vasodilation: {vaso:.1f}%")
-            return line_no2, line_cgmp, line_vaso, time_text, conc_text
-        
-        ani = animation.FuncAnimation(
-            fig, update, frames=len(self.t_eval),
-            init_func=init, blit=True, interval=1000/fps
-        )
-        
-        plt.tight_layout()
-        
-        # Save animation to a temporary buffer
-        buffer = BytesIO()
-        ani.save(buffer, format='gif', fps=fps, dpi=100)
-        buffer.seek(0)
-        
-        # Convert to base64 for embedding in HTML
-        img_str = base64.b64encode(buffer.read()).decode('utf-8')
-        
-        # Close the figure to free memory
-        plt.close(fig)
-        
-        return f'<img src="data:image/gif;base64,{img_str}" alt="Nitrite Simulation Animation">'
+        # Re-encoding is the expensive part; movies are shared by every simulator
+        # with the same parameters
+        key = (self._cache_key(), fps)
+        if key in self._animation_cache:
+            return self._animation_cache[key]
+        
+        fig, ani = self._make_ani(figsize=(10, 5), fps=fps)
+        
+        # H.264 is far smaller and cheaper to encode than GIF; fall back to
+        # Pillow's GIF writer when ffmpeg is not installed
+        use_video = animation.FFMpegWriter.isAvailable()
+        if use_video:
+            writer = animation.FFMpegWriter(fps=fps, bitrate=800, extra_args=['-pix_fmt', 'yuv420p'])
+            suffix = '.mp4'
+        else:
+            writer = animation.PillowWriter(fps=fps)
+            suffix = '.gif'
+        
+        # Movie writers need a real file path, so render into a temporary directory
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            movie_path = os.path.join(tmp_dir, f'animation{suffix}')
+            ani.save(movie_path, writer=writer, dpi=100)
+            with open(movie_path, 'rb') as movie_file:
+                movie_str = base64.b64encode(movie_file.read()).decode('utf-8')
+        
+        if use_video:
+            html = (f'<video autoplay loop muted playsinline src="data:video/mp4;base64,{movie_str}">'
+                    f'Nitrite Simulation Animation</video>')
+        else:
+            html = f'<img src="data:image/gif;base64,{movie_str}" alt="Nitrite Simulation Animation">'
+        if len(self._animation_cache) >= ANIMATION_CACHE_SIZE:
+            # Evict the oldest movie (dicts keep insertion order)
+            self._animation_cache.pop(next(iter(self._animation_cache)), None)
+        self._animation_cache[key] = html
+        return html
     
     def get_plot_as_base64(self):
         """Generate a base64 encoded static plot for web display"""
         if self.plasma_no2 is None:
-            self.simulate()
-            
-        fig, ax = self.plot_static(show=False)
-        
-        # Save figure to a temporary buffer
-        buffer = BytesIO()
-        fig.savefig(buffer, format='png', dpi=100)
-        buffer.seek(0)
-        
-        # Convert to base64 for embedding in HTML
-        img_str = base64.b64encode(buffer.read()).decode('utf-8')
-        
-        # Close the figure to free memory
-        plt.close(fig)
+            self._simulate_arrays()
         
-        return f'data:image/png;base64,{img_str}'
+        # The PNG depends only on the simulation parameters, so identical
+        # requests (from any simulator instance) reuse one rendering
+        return _plot_base64_cached(self._cache_key())
+
+
+def _draw_static_plot(ax, results, t_max):
+    """Draw the plasma NO₂⁻/cGMP/vasodilation time course from a (points, 9) results buffer"""
+    minutes = results[:, 1]
+    ax.plot(minutes, results[:, 2], lw=2, color='purple', label='Plasma NO₂⁻ (µM)')
+    ax.plot(minutes, results[:, 7], lw=2, color='green', linestyle='--', label='cGMP (a.u.)')
+    ax.plot(minutes, results[:, 8], lw=2, color='blue', linestyle=':', label='Vasodilation (%)')
+    
+    ax.set_xlim(0, t_max * 60)
+    ax.set_ylim(0, max(results[:, 8]) * 1.2)
+    ax.set_xlabel('Time (minutes)')
+    ax.set_ylabel('Response (relative units)')
+    ax.set_title('N1O1 Clinical Trials – Plasma NO₂⁻, cGMP, Vasodilation')
+    ax.grid(True)
+    ax.legend(loc='upper right')
+
+
+@functools.lru_cache(maxsize=32)
+def _plot_base64_cached(key):
+    """Render the static plot for a simulation key to a PNG data URI"""
+    # Off-screen Agg figure: no pyplot state, so safe to build from any thread
+    fig = Figure(figsize=(12, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    _draw_static_plot(fig.add_subplot(), _simulate_cached(key), key[1])
+    fig.tight_layout()
+    
+    buffer = BytesIO()
+    fig.canvas.print_png(buffer)
+    img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return f'data:image/png;base64,{img_str}'
+
+
+@functools.lru_cache(maxsize=64)
+def _simulate_cached(key):
+    """Solve the model once per distinct NODynamicsSimulator._cache_key()"""
+    (baseline, t_max, points, k_clear, k_rbc, dose,
+     formulation, doses, integrator, method, dtype) = key
+    
+    solver = NODynamicsSimulator(
+        baseline=baseline,
+        t_max=t_max,
+        points=points,
+        dose=dose,
+        additional_doses=[{'time': time, 'amount': amount} for time, amount in doses],
+        formulation=formulation,
+        integrator=integrator,
+        method=method,
+        dtype=dtype
+    )
+    # Rates may differ from the eGFR/RBC defaults (e.g. hypoxic scavenging)
+    solver.k_clear = k_clear
+    solver.k_rbc = k_rbc
+    
+    results = solver._solve()
+    results.flags.writeable = False
+    return results
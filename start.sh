@@ -33,5 +33,25 @@ echo "🗄️  Initializing database..."
 python -c "from models import init_db; init_db()"
 
 # Start the application
-echo "🌟 Starting Flask application on port ${PORT:-5000}..."
-python main.py
+# gthread workers handle requests concurrently (workers x threads); WEB_CONCURRENCY overrides the worker count
+# --preload imports the app once in the master so forked workers share its read-only pages
+# WORKER_CLASS=gevent swaps in cooperative workers for I/O-heavy deployments (requires gevent)
+WORKERS=${WEB_CONCURRENCY:-$(( 2 * $(nproc) + 1 ))}
+WORKER_CLASS=${WORKER_CLASS:-gthread}
+# Concurrency knobs are class-specific: --threads sizes gthread's thread pool, while
+# --worker-connections only caps the eventlet/gevent workers
+case "${WORKER_CLASS}" in
+    gevent|eventlet) WORKER_OPTS=(--worker-connections 1000) ;;
+    *) WORKER_OPTS=(--threads 8) ;;
+esac
+echo "🌟 Starting Flask application on port ${PORT:-5000} with ${WORKERS} workers..."
+exec gunicorn \
+    --bind "0.0.0.0:${PORT:-5000}" \
+    --reuse-port \
+    --workers "${WORKERS}" \
+    --worker-class "${WORKER_CLASS}" \
+    "${WORKER_OPTS[@]}" \
+    --worker-tmp-dir /dev/shm \
+    --keep-alive 5 \
+    --preload \
+    main:app
@@ -6,11 +6,16 @@ License: MIT
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import scipy.stats as stats
+from scipy.integrate import trapezoid
 from io import BytesIO
 import base64
 
+# matplotlib's qualitative tab10 palette, spelled out so plot colours need no
+# colormap lookup (and no matplotlib import) at module load
+_TAB10 = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf')
+
 class StatisticalAnalyzer:
     """
     A class for analyzing nitrite, cGMP, and vasodilation data from clinical trials
@@ -18,7 +23,7 @@ class StatisticalAnalyzer:
     
     def __init__(self):
         """Initialize the statistical analyzer"""
-        pass
+        self._numeric_cols = None
     
     def load_data(self, file_path=None, dataframe=None):
         """
@@ -43,6 +48,10 @@ class StatisticalAnalyzer:
         else:
             raise ValueError("Either file_path or dataframe must be provided")
         
+        # Column layout is fixed until the next load, so probe it once here
+        self._cols = frozenset(self.data.columns)
+        self._time_col = 'Time (hours)' if 'Time (hours)' in self._cols else 'Time (minutes)'
+        self._numeric_cols = None
         return self.data
     
     def compute_descriptive_statistics(self, columns=None):
@@ -63,17 +72,33 @@ class StatisticalAnalyzer:
             raise ValueError("No data loaded. Call load_data first.")
         
         if columns is None:
-            numeric_cols = self.data.select_dtypes(include=[np.number]).columns.tolist()
+            # Column dtypes only change on load_data, so detect numeric columns once
+            if self._numeric_cols is None:
+                self._numeric_cols = self.data.select_dtypes(include=[np.number]).columns.tolist()
+            numeric_cols = self._numeric_cols
         else:
-            numeric_cols = [col for col in columns if col in self.data.columns]
-        
-        stats_df = self.data[numeric_cols].describe().T
-        
-        # Add additional statistics
-        stats_df['median'] = self.data[numeric_cols].median()
-        stats_df['skew'] = self.data[numeric_cols].skew()
-        stats_df['kurtosis'] = self.data[numeric_cols].kurtosis()
-        stats_df['variance'] = self.data[numeric_cols].var()
+            numeric_cols = [col for col in columns if col in self._cols]
+        
+        numeric_data = self.data[numeric_cols]
+        
+        # One grouped aggregation plus one quantile pass instead of describe() and four reductions
+        aggregated = numeric_data.agg(['count', 'mean', 'std', 'min', 'max', 'median', 'skew', 'kurt', 'var']).T
+        quartiles = numeric_data.quantile([0.25, 0.5, 0.75]).T
+        
+        stats_df = pd.DataFrame({
+            'count': aggregated['count'],
+            'mean': aggregated['mean'],
+            'std': aggregated['std'],
+            'min': aggregated['min'],
+            '25%': quartiles[0.25],
+            '50%': quartiles[0.5],
+            '75%': quartiles[0.75],
+            'max': aggregated['max'],
+            'median': aggregated['median'],
+            'skew': aggregated['skew'],
+            'kurtosis': aggregated['kurt'],
+            'variance': aggregated['var']
+        })
         
         return stats_df
     
@@ -96,10 +121,14 @@ class StatisticalAnalyzer:
         if not hasattr(self, 'data'):
             raise ValueError("No data loaded. Call load_data first.")
         
-        x = self.data[x_column].values
-        y = self.data[y_column].values
+        # Zero-copy views of the underlying column blocks where pandas allows it
+        x = self.data[x_column].to_numpy(dtype=np.float64, copy=False)
+        y = self.data[y_column].to_numpy(dtype=np.float64, copy=False)
         
-        auc = np.trapz(y, x)
+        if len(y) < 2:
+            return 0.0  # No interval to integrate over
+        
+        auc = trapezoid(y, x)
         return auc
     
     def peak_analysis(self, column):
@@ -119,7 +148,7 @@ class StatisticalAnalyzer:
         if not hasattr(self, 'data'):
             raise ValueError("No data loaded. Call load_data first.")
         
-        time_col = 'Time (hours)' if 'Time (hours)' in self.data.columns else 'Time (minutes)'
+        time_col = self._time_col
         
         peak_idx = self.data[column].idxmax()
         peak_value = self.data.loc[peak_idx, column]
@@ -150,41 +179,80 @@ class StatisticalAnalyzer:
         if not hasattr(self, 'data'):
             raise ValueError("No data loaded. Call load_data first.")
         
-        time_col = 'Time (hours)' if 'Time (hours)' in self.data.columns else 'Time (minutes)'
+        time_col = self._time_col
         if time_col == 'Time (minutes)':
             time_factor = 60.0  # Convert minutes to hours
         else:
             time_factor = 1.0
         
-        # Get peak information
-        peak_info = self.peak_analysis(column)
-        peak_idx = peak_info['peak_index']
-        peak_value = peak_info['peak_value']
+        # Work on the column arrays directly: the peak is located positionally, so
+        # no label lookups are needed and the post-peak tails are plain views
+        values = self.data[column].to_numpy()
+        times = self.data[time_col].to_numpy()
+        peak_pos = int(np.nanargmax(values))
+        peak_value = values[peak_pos]
         
-        # Use data after the peak for half-life calculation
-        post_peak_data = self.data.iloc[peak_idx:].copy()
+        post_peak_values = values[peak_pos:]
+        post_peak_times = times[peak_pos:]
         
-        if len(post_peak_data) < 3:
+        if len(post_peak_values) < 3:
             return None  # Not enough data points for calculation
         
         # If no baseline provided, use the last value as an approximation
         if baseline is None:
-            baseline = post_peak_data[column].iloc[-1]
+            baseline = post_peak_values[-1]
         
         # Calculate the time it takes to reach half of the peak value above baseline
         half_value = baseline + (peak_value - baseline) / 2
         
         # Find the closest point to the half value
-        post_peak_data['diff_from_half'] = abs(post_peak_data[column] - half_value)
-        half_idx = post_peak_data['diff_from_half'].idxmin()
+        half_pos = int(np.argmin(np.abs(post_peak_values - half_value)))
         
-        half_time = post_peak_data.loc[half_idx, time_col]
-        peak_time = post_peak_data.loc[peak_idx, time_col]
+        half_time = post_peak_times[half_pos]
+        peak_time = post_peak_times[0]
         
         half_life = (half_time - peak_time) / time_factor
         
         return half_life
     
+    def _metrics_from_arrays(self, x, y, time_factor=1.0):
+        """
+        Compute peak, AUC and half-life from raw time/value arrays in one pass
+        
+        Parameters:
+        -----------
+        x : numpy.ndarray
+            Time values
+        y : numpy.ndarray
+            Values of the analyzed column
+        time_factor : float, optional
+            Divisor converting x units to hours for the half-life
+            
+        Returns:
+        --------
+        dict
+            Dictionary containing peak_value, peak_index, time_to_peak, auc and half_life
+        """
+        peak_pos = int(np.nanargmax(y))
+        peak_value = y[peak_pos]
+        
+        half_life = None
+        post_peak_values = y[peak_pos:]
+        if len(post_peak_values) >= 3:
+            # Same rule as half_life_analysis with the last value as baseline
+            baseline = post_peak_values[-1]
+            half_value = baseline + (peak_value - baseline) / 2
+            half_pos = int(np.argmin(np.abs(post_peak_values - half_value)))
+            half_life = (x[peak_pos + half_pos] - x[peak_pos]) / time_factor
+        
+        return {
+            'peak_value': peak_value,
+            'peak_index': peak_pos,
+            'time_to_peak': x[peak_pos],
+            'auc': trapezoid(y, x),
+            'half_life': half_life
+        }
+    
     def compare_simulations(self, simulations, labels=None, column='Plasma NO2- (µM)'):
         """
         Compare multiple simulation results
@@ -209,27 +277,24 @@ class StatisticalAnalyzer:
         if len(simulations) != len(labels):
             raise ValueError("Length of simulations and labels must be the same")
         
-        comparison_metrics = []
+        # Column-oriented accumulation: building from a dict of lists skips the
+        # per-row key inference of the list-of-dicts constructor
+        comparison_metrics = {'Label': [], 'Peak Value': [], 'Time to Peak': [], 'AUC': [], 'Half-life': []}
         
-        for i, sim_df in enumerate(simulations):
-            analyzer = StatisticalAnalyzer()
-            analyzer.load_data(dataframe=sim_df)
-            
+        for label, sim_df in zip(labels, simulations):
             time_col = 'Time (hours)' if 'Time (hours)' in sim_df.columns else 'Time (minutes)'
+            time_factor = 60.0 if time_col == 'Time (minutes)' else 1.0
             
-            peak_info = analyzer.peak_analysis(column)
-            auc = analyzer.area_under_curve(time_col, column)
-            half_life = analyzer.half_life_analysis(column)
-            
-            metrics = {
-                'Label': labels[i],
-                'Peak Value': peak_info['peak_value'],
-                'Time to Peak': peak_info['time_to_peak'],
-                'AUC': auc,
-                'Half-life': half_life
-            }
+            # Pull both columns out once and derive every metric from the arrays
+            metrics = self._metrics_from_arrays(
+                sim_df[time_col].to_numpy(), sim_df[column].to_numpy(), time_factor
+            )
             
-            comparison_metrics.append(metrics)
+            comparison_metrics['Label'].append(label)
+            comparison_metrics['Peak Value'].append(metrics['peak_value'])
+            comparison_metrics['Time to Peak'].append(metrics['time_to_peak'])
+            comparison_metrics['AUC'].append(metrics['auc'])
+            comparison_metrics['Half-life'].append(metrics['half_life'])
         
         return pd.DataFrame(comparison_metrics)
     
@@ -259,11 +324,23 @@ class StatisticalAnalyzer:
         if len(simulations) != len(labels):
             raise ValueError("Length of simulations and labels must be the same")
         
-        fig, ax = plt.subplots(figsize=(12, 6))
+        # matplotlib is only needed here; importing it lazily keeps the analysis-only
+        # import path free of font cache and backend setup
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection
+        from matplotlib.figure import Figure
+        from matplotlib.lines import Line2D
+        
+        # Render on a bare Agg canvas: no pyplot global state, safe under threaded workers
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
         
-        colors = plt.cm.tab10(np.linspace(0, 1, len(simulations)))
+        # Cycle the discrete palette rather than resampling it across the run count
+        colors = [_TAB10[i % len(_TAB10)] for i in range(len(simulations))]
         
-        for i, sim_df in enumerate(simulations):
+        segments = []
+        for sim_df in simulations:
             time_col = 'Time (hours)' if 'Time (hours)' in sim_df.columns else 'Time (minutes)'
             
             if time_col == 'Time (minutes)':
@@ -271,23 +348,27 @@ class StatisticalAnalyzer:
             else:
                 x_label = 'Time (hours)'
             
-            ax.plot(sim_df[time_col], sim_df[column], 
-                   label=labels[i], color=colors[i], linewidth=2)
+            segments.append(np.column_stack([sim_df[time_col].to_numpy(), sim_df[column].to_numpy()]))
+        
+        # One collection draws every curve in a single artist
+        ax.add_collection(LineCollection(segments, colors=colors, linewidths=2))
+        ax.autoscale_view()
         
         ax.set_xlabel(x_label)
         ax.set_ylabel(column)
         ax.set_title(f'Comparison of {column} Across Simulations')
         ax.grid(True, alpha=0.3)
-        ax.legend(loc='best')
         
-        plt.tight_layout()
+        # The collection carries no per-curve labels, so the legend uses proxy lines
+        handles = [Line2D([], [], color=colors[i], linewidth=2) for i in range(len(simulations))]
+        ax.legend(handles, labels, loc='best')
+        
+        fig.tight_layout()
         
         if return_base64:
             buffer = BytesIO()
             fig.savefig(buffer, format='png', dpi=100)
-            buffer.seek(0)
-            img_str = base64.b64encode(buffer.read()).decode('utf-8')
-            plt.close(fig)
+            img_str = base64.b64encode(buffer.getbuffer()).decode('ascii')
             return f'data:image/png;base64,{img_str}'
         else:
             return fig
@@ -336,23 +417,27 @@ class StatisticalAnalyzer:
         if not hasattr(self, 'data'):
             raise ValueError("No data loaded. Call load_data first.")
         
-        time_col = 'Time (hours)' if 'Time (hours)' in self.data.columns else 'Time (minutes)'
+        time_col = self._time_col
+        time_factor = 60.0 if time_col == 'Time (minutes)' else 1.0
+        
+        values = self.data[column]
+        metrics = self._metrics_from_arrays(
+            self.data[time_col].to_numpy(), values.to_numpy(), time_factor
+        )
         
-        peak_info = self.peak_analysis(column)
-        auc = self.area_under_curve(time_col, column)
-        half_life = self.half_life_analysis(column)
-        desc_stats = self.compute_descriptive_statistics([column])
+        # Only four statistics are reported, so skip the full descriptive table
+        desc_stats = values.agg(['mean', 'std', 'min', 'max'])
         
         report = {
             'Column': column,
-            'Peak Value': peak_info['peak_value'],
-            'Time to Peak': peak_info['time_to_peak'],
-            'AUC': auc,
-            'Half-life': half_life,
-            'Mean': desc_stats.loc[column, 'mean'],
-            'Std Dev': desc_stats.loc[column, 'std'],
-            'Min': desc_stats.loc[column, 'min'],
-            'Max': desc_stats.loc[column, 'max']
+            'Peak Value': metrics['peak_value'],
+            'Time to Peak': metrics['time_to_peak'],
+            'AUC': metrics['auc'],
+            'Half-life': metrics['half_life'],
+            'Mean': desc_stats['mean'],
+            'Std Dev': desc_stats['std'],
+            'Min': desc_stats['min'],
+            'Max': desc_stats['max']
         }
         
         return report
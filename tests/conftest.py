@@ -0,0 +1,66 @@
+"""
+Shared fixtures for the test suite
+"""
+import os
+
+# Cheap password hashing for tests; must be set before models is imported
+os.environ.setdefault('PWD_HASH_ROUNDS', '8')
+
+import pytest
+from unittest.mock import MagicMock
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from models import db
+from routes.ai_tools import ai_tools_bp
+from simulation_core import NODynamicsSimulator
+from utils.json_provider import orjson_dumps, orjson_loads
+
+@compiles(JSONB, 'sqlite')
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    """Store the Postgres JSONB columns as SQLite JSON in the test database"""
+    return 'JSON'
+
+@pytest.fixture(scope="session")
+def base_sim_results():
+    """Canonical 30 mg immediate-release simulation, shared by read-only tests"""
+    sim = NODynamicsSimulator(dose=30.0)
+    return sim, sim.simulate()
+
+@pytest.fixture(scope="session")
+def ai_client():
+    """Test client for the AI tools blueprint, mounted once on a bare app"""
+    # Blueprints carry no application of their own; the endpoint tests run
+    # in-process through the test client (no server needed)
+    app = Flask(__name__)
+    app.register_blueprint(ai_tools_bp)
+    return app.test_client()
+
+@pytest.fixture
+def mock_claude(monkeypatch):
+    """Replace claude_completion in the AI tools routes for one test"""
+    mock = MagicMock()
+    monkeypatch.setattr('routes.ai_tools.claude_completion', mock)
+    return mock
+
+@pytest.fixture(scope="session")
+def engine():
+    """In-memory SQLite engine with the schema created once per test run"""
+    engine = create_engine("sqlite:///:memory:", json_serializer=orjson_dumps, json_deserializer=orjson_loads)
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    """ORM session inside a transaction that is rolled back after the test"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    # Commits made by the test land in a savepoint, so the rollback still undoes them
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
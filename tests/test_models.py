@@ -5,6 +5,9 @@ import pytest
 from datetime import datetime
 from models import db, User, Patient, SupplementDose, NO2Level, Simulation, TrialCriteria, Consent, ClinicalNote, ChatSession, ChatMessage
 
+# Fixed dosing timestamp so serialized times are deterministic
+FROZEN_NOW = datetime(2025, 1, 14)
+
 class TestModels:
     """Test database models functionality"""
     
@@ -56,13 +59,32 @@ class TestModels:
         assert "exclusions" in criteria_dict['other_criteria']
         assert len(criteria_dict['other_criteria']['exclusions']) == 2
     
+    def test_json_column_round_trip(self, session):
+        """Test JSON columns are stored and read back intact"""
+        criteria = TrialCriteria(
+            name="N1O1 Phase II Trial",
+            other_criteria={
+                "exclusions": ["pregnancy", "hypertension"],
+                "max_egfr_decline": 0.25
+            }
+        )
+        session.add(criteria)
+        session.commit()
+        session.expire_all()
+        
+        stored = session.get(TrialCriteria, criteria.id)
+        assert stored.other_criteria == {
+            "exclusions": ["pregnancy", "hypertension"],
+            "max_egfr_decline": 0.25
+        }
+    
     def test_supplement_dose_tracking(self):
         """Test supplement dose model"""
         dose = SupplementDose(
             patient_id=1,
             supplement="N1O1 Lozenge",
             dose_mg=30.0,
-            time_given=datetime.utcnow(),
+            time_given=FROZEN_NOW,
             notes="Administered under fasting conditions"
         )
         
@@ -70,6 +92,7 @@ class TestModels:
         assert dose_dict['supplement'] == "N1O1 Lozenge"
         assert dose_dict['dose_mg'] == 30.0
         assert dose_dict['patient_id'] == 1
+        assert dose_dict['time_given'] == "2025-01-14T00:00:00"
     
     def test_simulation_storage(self):
         """Test simulation model with JSON parameters"""
@@ -152,13 +175,13 @@ class TestModels:
         assert message_dict['role'] == "user"
         assert message_dict['attachment']['type'] == "image"
     
-    def test_model_relationships(self):
+    def test_model_relationships(self, session):
         """Test model relationships and cascading"""
         patient = Patient(name="Jane Doe", age=28, weight_kg=65.0, baseline_no2=0.25)
         
         # Test relationship setup
-        dose1 = SupplementDose(supplement="N1O1", dose_mg=30.0, time_given=datetime.utcnow())
-        dose2 = SupplementDose(supplement="NO Beetz", dose_mg=15.0, time_given=datetime.utcnow())
+        dose1 = SupplementDose(supplement="N1O1", dose_mg=30.0, time_given=FROZEN_NOW)
+        dose2 = SupplementDose(supplement="NO Beetz", dose_mg=15.0, time_given=FROZEN_NOW)
         
         patient.doses.append(dose1)
         patient.doses.append(dose2)
@@ -166,3 +189,12 @@ class TestModels:
         assert len(patient.doses) == 2
         assert patient.doses[0].supplement == "N1O1"
         assert patient.doses[1].supplement == "NO Beetz"
+        
+        # Doses are persisted with the patient and removed along with it
+        session.add(patient)
+        session.commit()
+        assert session.query(SupplementDose).filter_by(patient_id=patient.id).count() == 2
+        
+        session.delete(patient)
+        session.commit()
+        assert session.query(SupplementDose).count() == 0
@@ -0,0 +1,177 @@
+"""
+Test suite for the real-time monitoring module
+"""
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from utils.realtime_monitoring import MetricRing, RealTimeMonitor, TrendAnalyzer, _window_moments
+
+T0 = datetime(2024, 1, 1)
+
+def _push_all(ring, values):
+    """Push values one at a time, yielding the trailing window numpy should agree with"""
+    for i, value in enumerate(values):
+        ring.push(value, 0.0, T0 + timedelta(seconds=i))
+        yield values[max(0, i + 1 - ring.size):i + 1]
+
+class TestMetricRing:
+    """Test the running statistics of the metric ring buffer"""
+    
+    @pytest.mark.parametrize("n", [1, 7, 64])
+    def test_window_moments_match_numpy(self, n):
+        """Test the two-pass kernel against numpy over the leading n values"""
+        values = np.random.default_rng(1).normal(50.0, 5.0, 64)
+        mean, m2 = _window_moments(values, n)
+        np.testing.assert_allclose(mean, np.mean(values[:n]), rtol=1e-12)
+        np.testing.assert_allclose(m2 / n, np.var(values[:n]), rtol=1e-10, atol=1e-12)
+    
+    def test_running_moments_match_numpy_across_laps(self):
+        """Test mean and std after every push while the window wraps several times"""
+        # A large offset makes the O(1) updates lose precision fastest
+        values = 1e6 + np.random.default_rng(2).normal(0.0, 3.0, 16 * 5 + 7)
+        ring = MetricRing(16)
+        for window in _push_all(ring, values):
+            assert len(ring) == len(window)
+            np.testing.assert_allclose(ring.mean, np.mean(window), rtol=1e-12)
+            np.testing.assert_allclose(ring.std(), np.std(window), rtol=1e-6)
+    
+    def test_constant_input_has_zero_spread(self):
+        """Test that a constant signal never reports a negative or noisy variance"""
+        values = np.full(40, 3.7)
+        ring = MetricRing(16)
+        for window in _push_all(ring, values):
+            assert ring.m2 >= 0.0
+            np.testing.assert_allclose(ring.mean, np.mean(window), rtol=1e-12)
+            assert ring.std() == pytest.approx(np.std(window), abs=1e-12)
+    
+    def test_nan_leaves_statistics_once_evicted(self):
+        """Test that a NaN poisons the statistics only while it is inside the window"""
+        values = np.r_[np.arange(5.0), np.nan, np.arange(20.0)]
+        ring = MetricRing(8)
+        for window in _push_all(ring, values):
+            np.testing.assert_allclose(ring.mean, np.mean(window), rtol=1e-12)
+            np.testing.assert_allclose(ring.std(), np.std(window), rtol=1e-9)
+        assert np.isfinite(ring.mean)
+    
+    def test_extend_matches_push(self):
+        """Test that a batch append leaves the same window and statistics as single pushes"""
+        values = np.random.default_rng(3).normal(10.0, 2.0, 37)
+        pushed = MetricRing(16)
+        for _ in _push_all(pushed, values):
+            pass
+        extended = MetricRing(16)
+        extended.extend(values, np.zeros(len(values)), [T0 + timedelta(seconds=i) for i in range(len(values))])
+        
+        np.testing.assert_array_equal(extended.tail_values(16), pushed.tail_values(16))
+        np.testing.assert_allclose(extended.mean, pushed.mean, rtol=1e-12)
+        np.testing.assert_allclose(extended.std(), pushed.std(), rtol=1e-9)
+
+
+class TestTrendAnalyzer:
+    """Test the running least-squares trend fit"""
+    
+    def test_fit_matches_polyfit_after_eviction(self):
+        """Test slope, intercept and strength against np.polyfit as the window slides"""
+        rng = np.random.default_rng(4)
+        # Window length does not divide the sample count, so the last fits come
+        # from O(1) updates rather than a fresh resync
+        values = 200.0 + 0.3 * np.arange(95) + rng.normal(0.0, 2.0, 95)
+        analyzer = TrendAnalyzer(window_size=20)
+        
+        for i, value in enumerate(values):
+            result = analyzer.analyze(value)
+            window = values[max(0, i - 19):i + 1]
+            if len(window) < 3:
+                assert result['trend'] == 'insufficient_data'
+                continue
+            
+            x = np.arange(len(window))
+            slope, intercept = np.polyfit(x, window, 1)
+            r_squared = np.corrcoef(x, window)[0, 1] ** 2
+            assert result['slope'] == pytest.approx(slope, rel=1e-8, abs=1e-10)
+            assert result['prediction'] - result['slope'] * len(window) == pytest.approx(intercept, rel=1e-10)
+            assert result['strength'] == pytest.approx(r_squared, rel=1e-8, abs=1e-12)
+        
+        assert result['trend'] == 'increasing'
+
+class TestRealTimeMonitor:
+    """Test metric processing and alert dispatch"""
+    
+    def test_alert_callbacks_run_in_registration_order(self):
+        """Test that sync and async callbacks fire in registration order and survive failures"""
+        monitor = RealTimeMonitor(buffer_size=50)
+        monitor.add_metric('no2', upper_threshold=5.0)
+        calls = []
+        
+        def first(alert):
+            calls.append('first')
+        
+        async def second(alert):
+            await asyncio.sleep(0)
+            calls.append('second')
+        
+        def broken(alert):
+            calls.append('broken')
+            raise RuntimeError("callback failure")
+        
+        class Unhashable:
+            """Callable object that defines equality and so cannot be hashed"""
+            __hash__ = None
+            
+            def __eq__(self, other):
+                return self is other
+            
+            def __call__(self, alert):
+                calls.append('unhashable')
+        
+        callbacks = [first, second, broken, Unhashable(), first]
+        for callback in callbacks:
+            monitor.register_alert_callback(callback)
+        assert monitor.alert_callbacks == tuple(callbacks)
+        
+        result = asyncio.run(monitor.process_data_point('no2', 7.5, datetime(2024, 1, 1)))
+        
+        assert result['alerts'][0]['type'] == 'threshold_breach'
+        assert calls == ['first', 'second', 'broken', 'unhashable', 'first']
+    
+    def test_process_batch_matches_point_loop(self):
+        """Test that batches raise the same anomaly scores and alerts as one point at a time"""
+        rng = np.random.default_rng(6)
+        values = 10.0 + rng.normal(0.0, 0.2, 300)
+        values[[40, 41, 120, 260]] = [10.9, 9.1, 11.2, 8.8]  # Threshold breaches
+        values[150:190] += 12.0  # Rapid change, then a sustained anomaly
+        stamps = [T0 + timedelta(seconds=i) for i in range(len(values))]
+        
+        def monitor():
+            m = RealTimeMonitor(buffer_size=64)
+            m.add_metric('no2', lower_threshold=9.2, upper_threshold=10.8, trend_window=20)
+            fired = []
+            m.register_alert_callback(fired.append)
+            return m, fired
+        
+        async def feed():
+            single, single_fired = monitor()
+            results = [await single.process_data_point('no2', v, t) for v, t in zip(values, stamps)]
+            
+            batched, batch_fired = monitor()
+            scores, alerts, trend = [], {}, None
+            # Batch sizes include the warm-up, a single point and one longer than the buffer
+            start = 0
+            for size in [3, 1, 30, 90, 7, 64, 105]:
+                result = await batched.process_batch('no2', values[start:start + size], stamps[start:start + size])
+                scores.append(result['anomaly_scores'])
+                alerts.update({start + a['index']: a['alerts'] for a in result['alerts']})
+                trend = result['trend']
+                start += size
+            assert start == len(values)
+            return results, single_fired, np.concatenate(scores), alerts, trend, batch_fired
+        
+        results, single_fired, scores, alerts, trend, batch_fired = asyncio.run(feed())
+        
+        np.testing.assert_allclose(scores, [r['anomaly_score'] for r in results], rtol=1e-9, atol=1e-12)
+        assert alerts == {i: r['alerts'] for i, r in enumerate(results) if r['alerts']}
+        assert {a['type'] for found in alerts.values() for a in found} == {
+            'threshold_breach', 'rapid_change', 'sustained_anomaly'}
+        assert batch_fired == single_fired
+        assert trend['slope'] == pytest.approx(results[-1]['trend']['slope'], rel=1e-9)
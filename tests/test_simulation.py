@@ -5,7 +5,30 @@ Revolutionary pharmacokinetic modeling tests
 import pytest
 import numpy as np
 import pandas as pd
-from simulation_core import NODynamicsSimulator
+from scipy.integrate import solve_ivp, trapezoid
+from simulation_core import DISSOLUTION_TIME, NODynamicsSimulator, _no2_rhs
+
+COMPARTMENTS = ('Plasma NO2- (µM)', 'Tissue NO2- (µM)', 'RBC NO2- (µM)')
+
+def _fine_reference(sim):
+    """
+    Tight-tolerance, small-step solve_ivp solution on a simulated sim's grid
+    
+    Fixed settings that no backend under test uses, so backends are checked
+    against it rather than against each other.
+    """
+    sol = solve_ivp(
+        _no2_rhs,
+        [0, sim.t_max],
+        [sim.baseline, sim.baseline * 0.5, sim.baseline * 0.2],
+        t_eval=sim.t_eval,
+        method='DOP853',
+        rtol=1e-10,
+        atol=1e-12,
+        max_step=DISSOLUTION_TIME / 20,
+        args=(sim._rhs_params(), sim._flux_edges, sim._flux_values)
+    )
+    return dict(zip(COMPARTMENTS, sol.y))
 
 class TestNODynamicsSimulator:
     """Test the nitric oxide dynamics simulation engine"""
@@ -29,10 +52,22 @@ class TestNODynamicsSimulator:
         assert 'cGMP (a.u.)' in results.columns
         assert 'Vasodilation (%)' in results.columns
         
-    def test_multi_compartment_model(self):
+    def test_constructor_parameters(self):
+        """Test constructor arguments are stored and derived rates computed"""
+        sim = NODynamicsSimulator(baseline=0.3, t_max=4, points=120, egfr=60.0,
+                                  rbc_count=5.0e6, dose=45.0, formulation="extended-release")
+        
+        assert (sim.baseline, sim.t_max, sim.points, sim.dose) == (0.3, 4, 120, 45.0)
+        assert sim.formulation == "extended-release"
+        assert sim.additional_doses == []
+        assert sim.k_clear == pytest.approx(0.1)
+        assert sim.k_rbc == pytest.approx(0.02 * 5.0 * (1 - 0.5 * 0.03))
+        assert sim.plasma_no2 is None and sim.results_df is None
+        
+    def test_multi_compartment_model(self, base_sim_results):
         """Test multi-compartment pharmacokinetic model"""
-        sim = NODynamicsSimulator(dose=30.0, formulation="immediate-release")
-        results = sim.simulate()
+        sim, results = base_sim_results
+        assert sim.formulation == "immediate-release"
         
         # Check all compartments are present
         assert 'Plasma NO2- (µM)' in results.columns
@@ -79,20 +114,185 @@ class TestNODynamicsSimulator:
             t_max=8
         )
         
-        results = sim.simulate()
+        sim.simulate()
         
         # Check for multiple peaks
-        plasma_levels = results['Plasma NO2- (µM)'].values
-        
-        # Find local maxima (simple approach)
-        peaks = []
-        for i in range(1, len(plasma_levels) - 1):
-            if plasma_levels[i] > plasma_levels[i-1] and plasma_levels[i] > plasma_levels[i+1]:
-                peaks.append(i)
+        peaks = sim.tmax_tpeak()
         
         # Should have at least 3 peaks (one for each dose)
         assert len(peaks) >= 3
         
+        # Peaks are reported in time order, each following its dose
+        peak_times = [t for t, _ in peaks]
+        assert peak_times == sorted(peak_times)
+        assert peak_times[1] > 120 and peak_times[2] > 240
+        
+    def test_numba_integrator_matches_scipy(self):
+        """Test the compiled Dormand-Prince kernel against solve_ivp"""
+        from simulation_core import NUMBA_AVAILABLE
+        if not NUMBA_AVAILABLE:
+            pytest.skip("numba not installed")
+        
+        for formulation in ("immediate-release", "extended-release"):
+            results_scipy = NODynamicsSimulator(dose=30.0, formulation=formulation, integrator="scipy").simulate()
+            results_nbrk = NODynamicsSimulator(dose=30.0, formulation=formulation, integrator="nbrk").simulate()
+            
+            np.testing.assert_allclose(
+                results_nbrk['Plasma NO2- (µM)'], results_scipy['Plasma NO2- (µM)'], rtol=1e-3
+            )
+        
+    def test_lsoda_integrator_catches_additional_doses(self):
+        """Test the odeint backend resolves every dose pulse"""
+        additional_doses = [{'time': 2.0, 'amount': 15.0}, {'time': 4.0, 'amount': 15.0}]
+        sim = NODynamicsSimulator(dose=30.0, additional_doses=additional_doses, t_max=8,
+                                  integrator="lsoda")
+        results = sim.simulate()
+        plasma = results['Plasma NO2- (µM)'].values
+        
+        # Each additional dose must raise plasma nitrite shortly after it is given
+        for dose in additional_doses:
+            before = np.searchsorted(sim.t_eval, dose['time'])
+            after = np.searchsorted(sim.t_eval, dose['time'] + 0.2)
+            assert plasma[after] > plasma[before] + 5.0
+        
+    def test_scipy_integrator_catches_additional_doses(self):
+        """Test the solve_ivp backend resolves every dose pulse"""
+        additional_doses = [{'time': 2.0, 'amount': 15.0}, {'time': 4.0, 'amount': 15.0}]
+        sim = NODynamicsSimulator(dose=30.0, additional_doses=additional_doses, t_max=8,
+                                  integrator="scipy")
+        results_scipy = sim.simulate()
+        
+        np.testing.assert_allclose(
+            results_scipy['Plasma NO2- (µM)'], _fine_reference(sim)['Plasma NO2- (µM)'], rtol=1e-3, atol=1e-3
+        )
+        
+    @pytest.mark.parametrize("integrator", ["lsoda", "scipy", "nbrk", "analytic"])
+    def test_overlapping_doses_match_fine_reference(self, integrator):
+        """Test every backend through dose pulses whose dissolution windows overlap"""
+        # The second pulse starts 3 minutes into the first one's 5-minute window
+        additional_doses = [{'time': 1.0, 'amount': 30.0}, {'time': 1.05, 'amount': 30.0}]
+        sim = NODynamicsSimulator(dose=30.0, additional_doses=additional_doses, integrator=integrator)
+        results = sim.simulate()
+        reference = _fine_reference(sim)
+        
+        for column in COMPARTMENTS:
+            np.testing.assert_allclose(results[column], reference[column], rtol=1e-3, atol=1e-3)
+        
+    def test_analytic_solution_matches_scipy(self):
+        """Test the closed-form immediate-release solution against solve_ivp"""
+        results_scipy = NODynamicsSimulator(dose=30.0, integrator="scipy").simulate()
+        results_analytic = NODynamicsSimulator(dose=30.0, integrator="analytic").simulate()
+        
+        for column in ('Plasma NO2- (µM)', 'Tissue NO2- (µM)', 'RBC NO2- (µM)'):
+            np.testing.assert_allclose(results_analytic[column], results_scipy[column], rtol=1e-3)
+        
+    def test_forced_analytic_falls_back_for_extended_release(self):
+        """Test that forcing the closed form on extended release still integrates its input"""
+        sim = NODynamicsSimulator(dose=30.0, formulation="extended-release", integrator="analytic")
+        assert sim._select_integrator() != "analytic"
+        results_forced = sim.simulate()
+        results_scipy = NODynamicsSimulator(dose=30.0, formulation="extended-release",
+                                            integrator="scipy").simulate()
+        
+        np.testing.assert_allclose(
+            results_forced['Plasma NO2- (µM)'], results_scipy['Plasma NO2- (µM)'], rtol=1e-3
+        )
+        
+    def test_analytic_solution_with_additional_doses(self):
+        """Test the closed-form superposition against a fine-step reference with repeat dosing"""
+        additional_doses = [{'time': 1.234, 'amount': 10.0}, {'time': 1.27, 'amount': 5.0},
+                            {'time': 6.5, 'amount': 20.0}]
+        sim = NODynamicsSimulator(dose=30.0, additional_doses=additional_doses)
+        assert sim._select_integrator() == "analytic"
+        results_analytic = sim.simulate()
+        reference = _fine_reference(sim)
+        
+        for column in COMPARTMENTS:
+            np.testing.assert_allclose(results_analytic[column], reference[column], rtol=1e-3)
+        
+    def test_simulation_cache(self):
+        """Test that repeated simulations share results without leaking edits"""
+        from simulation_core import _simulate_cached
+        
+        first = NODynamicsSimulator(dose=25.0).simulate()
+        hits_before = _simulate_cached.cache_info().hits
+        
+        # Editing a returned frame must not corrupt the cached solution
+        first.loc[0, 'Plasma NO2- (µM)'] = -1.0
+        second = NODynamicsSimulator(dose=25.0).simulate()
+        
+        assert _simulate_cached.cache_info().hits == hits_before + 1
+        assert second.loc[0, 'Plasma NO2- (µM)'] == pytest.approx(0.2)
+        
+        # A different parameter set must not hit the same entry
+        other = NODynamicsSimulator(dose=35.0).simulate()
+        assert other['Plasma NO2- (µM)'].max() > second['Plasma NO2- (µM)'].max()
+        
+    def test_float32_results(self):
+        """Test float32 results stay within 1e-4 of the float64 solution"""
+        additional_doses = [{'time': 2.0, 'amount': 15.0}]
+        for formulation in ("immediate-release", "extended-release"):
+            results_64 = NODynamicsSimulator(formulation=formulation, additional_doses=additional_doses).simulate()
+            results_32 = NODynamicsSimulator(formulation=formulation, additional_doses=additional_doses,
+                                             dtype=np.float32).simulate()
+        
+            assert (results_32.dtypes == np.float32).all()
+        
+            # Error relative to each column's scale
+            scale = results_64.abs().max()
+            relative_error = ((results_32 - results_64).abs() / scale).max().max()
+            assert relative_error < 1e-4
+        
+    def test_cohort_simulation(self):
+        """Test that a batched cohort matches individual simulations"""
+        cohort = pd.DataFrame({
+            'egfr': [90.0, 45.0],
+            'rbc_count': [4.5e6, 3.0e6],
+            'dose': [30.0, 60.0]
+        }, index=pd.Index(['P001', 'P002'], name='patient_id'))
+        
+        sim = NODynamicsSimulator(integrator="nbrk")
+        results = sim.simulate_cohort(cohort)
+        
+        assert results.shape == (2 * sim.points, 9)
+        assert list(results.index.names) == ['patient_id', 'step']
+        
+        for patient_id, row in cohort.iterrows():
+            single = NODynamicsSimulator(egfr=row['egfr'], rbc_count=row['rbc_count'],
+                                         dose=row['dose'], integrator="nbrk").simulate()
+            # Without numba the single run falls back to odeint, hence the tolerance
+            np.testing.assert_allclose(results.loc[patient_id].to_numpy(), single.to_numpy(),
+                                       rtol=1e-3)
+        
+    def test_batch_dose_sweep(self):
+        """Test that a batched dose/oxygen sweep matches individual simulations"""
+        sim = NODynamicsSimulator(integrator="nbrk")
+        doses = [10.0, 30.0, 50.0]
+        results = sim.simulate_batch(doses, oxygen_saturation=[0.97, 0.8, 0.97])
+        
+        assert list(results.index.names) == ['run', 'step']
+        for run, dose in enumerate(doses):
+            single = NODynamicsSimulator(dose=dose, integrator="nbrk")
+            expected = single.simulate_hypoxia(0.8) if run == 1 else single.simulate()
+            np.testing.assert_allclose(results.loc[run].to_numpy(), expected.to_numpy(), rtol=1e-3)
+        
+    def test_analytic_jacobian(self):
+        """Test the analytic Jacobian against finite differences of the ODE"""
+        sim = NODynamicsSimulator(dose=30.0)
+        jacobian = sim._no2_jac()
+        
+        y = np.array([1.0, 2.0, 3.0])
+        eps = 1e-6
+        for j in range(3):
+            step = np.zeros(3)
+            step[j] = eps
+            column = (np.array(sim._no2_ode(1.0, y + step)) - np.array(sim._no2_ode(1.0, y - step))) / (2 * eps)
+            np.testing.assert_allclose(jacobian[:, j], column, atol=1e-8)
+        
+        # Implicit methods should accept the precomputed Jacobian
+        results = NODynamicsSimulator(dose=30.0, integrator="scipy", method="LSODA").simulate()
+        assert len(results) == 360
+        
     def test_hypoxia_simulation(self):
         """Test hypoxic conditions effect on NO production"""
         sim = NODynamicsSimulator(dose=30.0)
@@ -122,11 +322,17 @@ class TestNODynamicsSimulator:
         
         # With lower eGFR, clearance should be slower
         # Leading to higher AUC (area under curve)
-        auc_normal = np.trapz(results_normal['Plasma NO2- (µM)'], results_normal['Time (hours)'])
-        auc_impaired = np.trapz(results_impaired['Plasma NO2- (µM)'], results_impaired['Time (hours)'])
+        auc_normal = sim_normal.auc_plasma
+        auc_impaired = sim_impaired.auc_plasma
         
         assert auc_impaired > auc_normal
         
+        # Matches a trapezoidal integration over the returned frame
+        np.testing.assert_allclose(
+            auc_normal,
+            trapezoid(results_normal['Plasma NO2- (µM)'], results_normal['Time (hours)'])
+        )
+        
     def test_rbc_count_impact(self):
         """Test impact of RBC count on nitrite scavenging"""
         # Normal RBC count
@@ -144,10 +350,9 @@ class TestNODynamicsSimulator:
         
         assert rbc_anemic < rbc_normal
         
-    def test_vasodilation_response(self):
+    def test_vasodilation_response(self, base_sim_results):
         """Test vasodilation calculations"""
-        sim = NODynamicsSimulator(dose=30.0)
-        results = sim.simulate()
+        _, results = base_sim_results
         
         # Vasodilation should correlate with cGMP
         cgmp = results['cGMP (a.u.)'].values
@@ -161,10 +366,9 @@ class TestNODynamicsSimulator:
         # Maximum vasodilation should be reasonable
         assert 100 <= vasodilation.max() <= 200  # 0-100% increase from baseline
         
-    def test_export_functionality(self):
+    def test_export_functionality(self, base_sim_results):
         """Test data export capabilities"""
-        sim = NODynamicsSimulator(dose=30.0)
-        sim.simulate()
+        sim, _ = base_sim_results
         
         # Test CSV export
         import tempfile
@@ -185,33 +389,56 @@ class TestNODynamicsSimulator:
             if os.path.exists(filename):
                 os.unlink(filename)
                 
-    def test_visualization_generation(self):
+    def test_export_to_parquet(self, base_sim_results, tmp_path):
+        """Test columnar export is lossless at float32 and much smaller than CSV"""
+        pytest.importorskip("pyarrow")
+        sim, results = base_sim_results
+        
+        parquet_file = sim.export_to_parquet(tmp_path / "results.parquet")
+        csv_file = sim.export_to_csv(tmp_path / "results.csv", float_format=None)
+        
+        df_read = pd.read_parquet(parquet_file)
+        assert list(df_read.columns) == list(results.columns)
+        assert (df_read.dtypes == np.float32).all()
+        np.testing.assert_allclose(df_read.to_numpy(), results.to_numpy(), rtol=1e-6)
+        
+        assert parquet_file.stat().st_size < csv_file.stat().st_size / 3
+    
+    def test_visualization_generation(self, base_sim_results):
         """Test plot generation capabilities"""
-        sim = NODynamicsSimulator(dose=30.0)
-        sim.simulate()
+        sim, _ = base_sim_results
         
         # Test base64 plot generation
         base64_plot = sim.get_plot_as_base64()
         assert base64_plot.startswith('data:image/png;base64,')
         
-        # Test animation HTML generation
-        animation_html = sim.get_animation_html(fps=3)
-        assert '<img src="data:image/gif;base64,' in animation_html
+        # Test animation HTML generation (MP4 when ffmpeg is available, GIF otherwise).
+        # Every time point is a frame, so a coarse grid keeps the GIF fallback quick
+        small_sim = NODynamicsSimulator(dose=30.0, points=12)
+        animation_html = small_sim.get_animation_html(fps=3)
+        assert ('<video autoplay loop muted playsinline src="data:video/mp4;base64,' in animation_html
+                or '<img src="data:image/gif;base64,' in animation_html)
         
-    def test_dose_response_curve(self):
-        """Test dose-response relationship"""
-        doses = [10, 20, 30, 40, 50]
-        peak_responses = []
+    def test_static_plot_returns_independent_figures(self, base_sim_results):
+        """Test that a later static plot leaves an earlier returned figure intact"""
+        sim, _ = base_sim_results
+        
+        first_fig, first_ax = sim.plot_static(show=False)
+        n_lines = len(first_ax.lines)
+        second_fig, _ = sim.plot_static(show=False)
         
-        for dose in doses:
-            sim = NODynamicsSimulator(dose=dose)
-            results = sim.simulate()
-            peak_responses.append(results['Plasma NO2- (µM)'].max())
+        assert second_fig is not first_fig
+        assert n_lines > 0 and len(first_ax.lines) == n_lines
+        
+    @pytest.mark.parametrize("lower_dose, higher_dose", [(10, 20), (20, 30), (30, 40), (40, 50)])
+    def test_dose_response_curve(self, lower_dose, higher_dose):
+        """Test dose-response relationship"""
+        peak_lower = NODynamicsSimulator(dose=lower_dose).simulate()['Plasma NO2- (µM)'].max()
+        peak_higher = NODynamicsSimulator(dose=higher_dose).simulate()['Plasma NO2- (µM)'].max()
         
         # Verify dose-response relationship
         # Higher doses should generally lead to higher peaks
-        for i in range(1, len(doses)):
-            assert peak_responses[i] >= peak_responses[i-1]
+        assert peak_higher >= peak_lower
             
     def test_steady_state_achievement(self):
         """Test steady-state with continuous dosing"""
@@ -2,6 +2,7 @@
 Advanced Analytics Module for N1O1 Clinical Trials
 Revolutionary statistical and machine learning tools for nitric oxide research
 """
+import hashlib
 import numpy as np
 import pandas as pd
 from scipy import stats, optimize, signal
@@ -12,9 +13,77 @@ from sklearn.ensemble import RandomForestRegressor
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+MODEL_CACHE_SIZE = 8  # Fitted models kept in memory per kind, keyed by training data
+
+def _frame_key(df):
+    """Content key for a DataFrame: column names plus a digest of every row"""
+    # Hashing contents, so an equal dataset rebuilt for another request still hits
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return (tuple(df.columns), hashlib.blake2b(row_hashes.tobytes()).hexdigest())
+
+def _cache_put(cache, key, value):
+    """Store a fitted model, evicting the oldest once the cache is full"""
+    if len(cache) >= MODEL_CACHE_SIZE:
+        # Dicts keep insertion order
+        cache.pop(next(iter(cache)), None)
+    cache[key] = value
+    return value
+
+# curve_fit evaluates the model and its Jacobian on every iteration; compiled
+# scalar loops compute each x**n once and allocate only the output
+@njit(cache=True)
+def _hill_equation(x, vmax, ec50, n):
+    """Hill dose-response curve"""
+    out = np.empty(x.shape[0])
+    en = ec50**n
+    for i in range(x.shape[0]):
+        xn = x[i]**n
+        out[i] = vmax * xn / (en + xn)
+    return out
+
+@njit(cache=True)
+def _hill_jacobian(x, vmax, ec50, n):
+    """Analytic partial derivatives of the Hill curve with respect to (vmax, ec50, n)"""
+    jac = np.empty((x.shape[0], 3))
+    en = ec50**n
+    log_ec50 = np.log(ec50)
+    for i in range(x.shape[0]):
+        xn = x[i]**n
+        denom = en + xn
+        occupancy = xn / denom
+        jac[i, 0] = occupancy
+        jac[i, 1] = -vmax * occupancy * n * en / (ec50 * denom)
+        # x**n * log(x) -> 0 as x -> 0, so zero doses contribute nothing to d/dn
+        log_x = np.log(x[i]) if x[i] > 0 else 0.0
+        jac[i, 2] = vmax * occupancy * en * (log_x - log_ec50) / denom
+    return jac
+
 class AdvancedNOAnalytics:
     """Advanced analytics for nitric oxide clinical trial data"""
     
+    # Fitted (model, training score) pairs keyed by a hash of the historical data,
+    # shared across instances so repeat predictions skip the forest fit
+    _model_cache = {}
+    
+    # Fitted (scaler, k-means, cluster labels) keyed by patient data and cluster count
+    _phenotype_cache = {}
+    
+    # Fitted signature PCA keyed by the biomarker panel, so re-scoring the same
+    # panel against new outcomes skips the SVD
+    _pca_cache = {}
+    
     def __init__(self):
         self.scaler = StandardScaler()
         
@@ -33,8 +102,16 @@ class AdvancedNOAnalytics:
         cmax = np.max(concentration)
         tmax = time[np.argmax(concentration)]
         
+        # Trapezoidal weights: each sample gets half of its neighbouring intervals.
+        # AUC and AUMC are then single dot products over the same weights
+        dt = np.diff(time)
+        weights = np.zeros(len(time))
+        weights[:-1] += dt
+        weights[1:] += dt
+        weights *= 0.5
+        
         # AUC using trapezoidal rule
-        auc = np.trapz(concentration, time)
+        auc = np.dot(weights, concentration)
         
         # Find half-life (time to reach half of Cmax after Tmax)
         post_peak_idx = np.where(time > tmax)[0]
@@ -59,7 +136,7 @@ class AdvancedNOAnalytics:
         clearance = cmax / auc if auc > 0 else np.nan
         
         # Mean Residence Time (MRT)
-        aumc = np.trapz(concentration * time, time)
+        aumc = np.dot(weights * time, concentration)
         mrt = aumc / auc if auc > 0 else np.nan
         
         # Volume of distribution (Vd)
@@ -80,16 +157,19 @@ class AdvancedNOAnalytics:
         """Estimate half-life using exponential decay fitting"""
         try:
             # Log-transform for linear fitting
-            log_conc = np.log(concentration[concentration > 0])
-            time_positive = time[concentration > 0]
+            positive = concentration > 0
+            log_conc = np.log(concentration[positive])
+            time_positive = time[positive]
             
-            # Linear regression on log-transformed data
-            slope, _ = np.polyfit(time_positive, log_conc, 1)
+            # Linear regression on log-transformed data (closed-form least-squares slope)
+            time_centered = time_positive - time_positive.mean()
+            slope = (time_centered @ (log_conc - log_conc.mean())) / (time_centered @ time_centered)
             
             # Half-life = -ln(2)/slope
             t_half = -np.log(2) / slope
             return abs(t_half)
-        except:
+        except (ValueError, TypeError, FloatingPointError):
+            # Unusable input (e.g. no positive concentrations under np.errstate(raise))
             return np.nan
     
     def analyze_dose_response(self, doses, responses):
@@ -99,29 +179,26 @@ class AdvancedNOAnalytics:
         Returns:
             dict: EC50, Hill coefficient, model parameters, and predictions
         """
-        doses = np.array(doses)
-        responses = np.array(responses)
+        doses = np.array(doses, dtype=np.float64)
+        responses = np.array(responses, dtype=np.float64)
         
         # Hill equation fitting
-        def hill_equation(x, vmax, ec50, n):
-            return vmax * (x**n) / (ec50**n + x**n)
-        
         try:
             # Initial parameter guess
             p0 = [np.max(responses), np.median(doses), 1.0]
             
             # Fit the model
-            popt, pcov = optimize.curve_fit(hill_equation, doses, responses, p0=p0)
+            popt, pcov = optimize.curve_fit(_hill_equation, doses, responses, p0=p0, jac=_hill_jacobian)
             
             # Calculate R-squared
-            predicted = hill_equation(doses, *popt)
+            predicted = _hill_equation(doses, *popt)
             ss_res = np.sum((responses - predicted)**2)
             ss_tot = np.sum((responses - np.mean(responses))**2)
             r_squared = 1 - (ss_res / ss_tot)
             
             # Generate smooth curve for visualization
             dose_range = np.linspace(0, np.max(doses) * 1.2, 100)
-            response_curve = hill_equation(dose_range, *popt)
+            response_curve = _hill_equation(dose_range, *popt)
             
             return {
                 'model': 'Hill Equation',
@@ -133,7 +210,9 @@ class AdvancedNOAnalytics:
                 'response_curve': response_curve,
                 'confidence_intervals': np.sqrt(np.diag(pcov))
             }
-        except:
+        except (RuntimeError, ValueError, TypeError, np.linalg.LinAlgError):
+            # curve_fit raises RuntimeError when it does not converge, ValueError on
+            # non-finite data and TypeError when there are fewer doses than parameters
             return {
                 'model': 'Hill Equation',
                 'error': 'Failed to fit model',
@@ -153,23 +232,33 @@ class AdvancedNOAnalytics:
         Returns:
             dict: Cluster assignments, characteristics, and predictions
         """
-        # Prepare data
-        X = self.scaler.fit_transform(patient_data)
+        self.scaler, kmeans, clusters = self._fit_phenotype_model(patient_data, n_clusters)
         
-        # Perform clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(X)
+        # Per-cluster response statistics as grouped reductions over all patients at once
+        response = np.asarray(response_data, dtype=np.float64)
+        counts = np.bincount(clusters, minlength=n_clusters)
+        means = np.bincount(clusters, weights=response, minlength=n_clusters) / counts
+        # Second pass around the cluster means: stable where sums of squares would cancel
+        stds = np.sqrt(np.bincount(clusters, weights=(response - means[clusters])**2,
+                                   minlength=n_clusters) / counts)
+        
+        # Sort once by cluster so each cluster is a contiguous run for min/max
+        sorted_response = response[np.argsort(clusters, kind='stable')]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        minima = np.minimum.reduceat(sorted_response, starts)
+        maxima = np.maximum.reduceat(sorted_response, starts)
+        
+        characteristics = patient_data.groupby(clusters).mean()
         
         # Analyze each cluster
         phenotypes = {}
         for i in range(n_clusters):
-            mask = clusters == i
             phenotypes[f'phenotype_{i+1}'] = {
-                'n_patients': np.sum(mask),
-                'mean_response': np.mean(response_data[mask]),
-                'std_response': np.std(response_data[mask]),
-                'characteristics': patient_data[mask].mean().to_dict(),
-                'response_range': (np.min(response_data[mask]), np.max(response_data[mask]))
+                'n_patients': counts[i],
+                'mean_response': means[i],
+                'std_response': stds[i],
+                'characteristics': characteristics.loc[i].to_dict(),
+                'response_range': (minima[i], maxima[i])
             }
         
         # Identify super-responders
@@ -178,11 +267,39 @@ class AdvancedNOAnalytics:
         
         return {
             'phenotypes': phenotypes,
-            'cluster_assignments': clusters,
+            'cluster_assignments': clusters.copy(),  # the cached labels stay private
             'super_responders': np.where(super_responders)[0].tolist(),
             'cluster_centers': self.scaler.inverse_transform(kmeans.cluster_centers_)
         }
     
+    def _fit_phenotype_model(self, patient_data, n_clusters):
+        """Scale and cluster patient data, reusing the fit for a dataset seen before"""
+        key = (_frame_key(patient_data), n_clusters)
+        if key in self._phenotype_cache:
+            return self._phenotype_cache[key]
+        
+        # Prepare data
+        scaler = StandardScaler()
+        X = scaler.fit_transform(patient_data)
+        
+        # Perform clustering
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        clusters = kmeans.fit_predict(X)
+        
+        return _cache_put(self._phenotype_cache, key, (scaler, kmeans, clusters))
+    
+    def _fit_signature_pca(self, biomarker_data):
+        """Fit the signature PCA, reusing the fit for a biomarker panel seen before"""
+        key = _frame_key(biomarker_data)
+        if key in self._pca_cache:
+            return self._pca_cache[key]
+        
+        # Only the loadings are used, so the panel is not transformed here
+        pca = PCA(n_components=min(5, biomarker_data.shape[1]))
+        pca.fit(biomarker_data)
+        
+        return _cache_put(self._pca_cache, key, pca)
+    
     def predict_treatment_response(self, patient_features, historical_data):
         """
         Machine learning model to predict treatment response
@@ -190,27 +307,23 @@ class AdvancedNOAnalytics:
         Returns:
             dict: Predicted response, confidence intervals, feature importance
         """
-        # Prepare training data
         X_train = historical_data.drop('response', axis=1)
-        y_train = historical_data['response']
-        
-        # Train Random Forest model
-        rf_model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
+        rf_model, model_score = self._fit_response_model(historical_data)
+        
+        # Per-tree predictions straight from the fitted tree structures; the forest
+        # mean is the prediction and their spread gives the interval. Trees split
+        # on float32, so convert once instead of revalidating the input per tree
+        X = np.ascontiguousarray(patient_features.reshape(1, -1), dtype=np.float32)
+        predictions_oob = np.fromiter(
+            (tree.tree_.predict(X).item(0) for tree in rf_model.estimators_),
+            dtype=np.float64, count=len(rf_model.estimators_)
         )
-        rf_model.fit(X_train, y_train)
         
         # Make prediction
-        prediction = rf_model.predict(patient_features.reshape(1, -1))[0]
+        prediction = predictions_oob.mean()
         
         # Calculate prediction intervals using out-of-bag predictions
-        predictions_oob = []
-        for tree in rf_model.estimators_:
-            predictions_oob.append(tree.predict(patient_features.reshape(1, -1))[0])
-        
-        prediction_std = np.std(predictions_oob)
+        prediction_std = predictions_oob.std()
         confidence_interval = (
             prediction - 1.96 * prediction_std,
             prediction + 1.96 * prediction_std
@@ -227,9 +340,29 @@ class AdvancedNOAnalytics:
             'confidence_interval_95': confidence_interval,
             'prediction_std': prediction_std,
             'feature_importance': feature_importance.to_dict('records'),
-            'model_score': rf_model.score(X_train, y_train)
+            'model_score': model_score
         }
     
+    def _fit_response_model(self, historical_data):
+        """Fit (or fetch the cached) Random Forest for a historical dataset"""
+        key = _frame_key(historical_data)
+        if key in self._model_cache:
+            return self._model_cache[key]
+        
+        # Prepare training data
+        X_train = historical_data.drop('response', axis=1)
+        y_train = historical_data['response']
+        
+        # Train Random Forest model
+        rf_model = RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            random_state=42
+        )
+        rf_model.fit(X_train, y_train)
+        
+        return _cache_put(self._model_cache, key, (rf_model, rf_model.score(X_train, y_train)))
+    
     def analyze_temporal_patterns(self, time_series_data, sampling_rate=1.0):
         """
         Analyze temporal patterns in physiological data
@@ -237,21 +370,35 @@ class AdvancedNOAnalytics:
         Returns:
             dict: Frequency components, periodicity, trends
         """
-        # Detrend the data
-        detrended = signal.detrend(time_series_data)
-        
-        # Perform FFT for frequency analysis
-        fft_vals = np.fft.fft(detrended)
-        fft_freq = np.fft.fftfreq(len(detrended), d=1/sampling_rate)
+        # Detrend the data: remove the least-squares line in closed form (two dot
+        # products on centred time) instead of signal.detrend's lstsq solve. The
+        # slope numerator, sum(y * (x - mean(x))), also gives the trend direction
+        values = np.asarray(time_series_data, dtype=np.float64)
+        centered_time = np.arange(len(values)) - (len(values) - 1) / 2
+        slope_numerator = values @ centered_time
+        time_ss = centered_time @ centered_time
+        slope = slope_numerator / time_ss if time_ss > 0 else 0.0
+        detrended = values - values.mean() - slope * centered_time
+        
+        # Perform FFT for frequency analysis; the input is real, so the negative
+        # frequencies mirror the positive ones and only the half spectrum is computed
+        fft_vals = np.fft.rfft(detrended)
+        fft_freq = np.fft.rfftfreq(len(detrended), d=1/sampling_rate)
         
         # Find dominant frequencies
-        power_spectrum = np.abs(fft_vals)**2
-        dominant_freq_idx = np.argsort(power_spectrum)[-5:]  # Top 5 frequencies
+        power_spectrum = fft_vals.real**2 + fft_vals.imag**2
+        # Top 5 frequencies: partial selection, then order just those by power
+        n_top = min(5, len(power_spectrum))
+        dominant_freq_idx = np.argpartition(power_spectrum, -n_top)[-n_top:]
+        dominant_freq_idx = dominant_freq_idx[np.argsort(power_spectrum[dominant_freq_idx])]
         dominant_frequencies = fft_freq[dominant_freq_idx]
         
-        # Detect periodicity using autocorrelation
-        autocorr = np.correlate(detrended, detrended, mode='full')
-        autocorr = autocorr[len(autocorr)//2:]
+        # Detect periodicity using autocorrelation, computed as the inverse FFT of the
+        # power spectrum (Wiener-Khinchin). Zero-padding to twice the length keeps the
+        # circular correlation from wrapping, so this equals the direct O(n²) sum
+        n_fft = 2 * len(detrended)
+        padded = np.fft.rfft(detrended, n=n_fft)
+        autocorr = np.fft.irfft(padded.real**2 + padded.imag**2, n=n_fft)[:len(detrended)]
         autocorr = autocorr / autocorr[0]  # Normalize
         
         # Find peaks in autocorrelation
@@ -269,7 +416,7 @@ class AdvancedNOAnalytics:
             'periodicity_detected': len(peaks) > 0,
             'period_lengths': peaks.tolist() if len(peaks) > 0 else [],
             'circadian_alignment_score': circadian_score,
-            'trend': 'increasing' if np.polyfit(range(len(time_series_data)), time_series_data, 1)[0] > 0 else 'decreasing',
+            'trend': 'increasing' if slope_numerator > 0 else 'decreasing',
             'variability': np.std(detrended)
         }
     
@@ -295,12 +442,12 @@ class AdvancedNOAnalytics:
             interaction_type = "Additive"
         
         # Statistical test (would need replicates in real scenario)
-        # Using simulated data for demonstration
-        np.random.seed(42)
-        simulated_expected = np.random.normal(expected_effect, expected_effect * 0.1, 100)
-        simulated_observed = np.random.normal(combination_therapy, combination_therapy * 0.1, 100)
+        # Using simulated data for demonstration: both arms in one draw from a
+        # private, fixed-seed generator (the global NumPy RNG is left untouched)
+        effects = np.array([expected_effect, combination_therapy], dtype=np.float64)
+        simulated = np.random.default_rng(42).normal(effects, effects * 0.1, size=(100, 2))
         
-        _, p_value = stats.ttest_ind(simulated_observed, simulated_expected)
+        _, p_value = stats.ttest_ind(simulated[:, 1], simulated[:, 0])
         
         return {
             'synergy_index': synergy_index,
@@ -320,8 +467,7 @@ class AdvancedNOAnalytics:
             dict: Signature components, weights, performance metrics
         """
         # Perform PCA
-        pca = PCA(n_components=min(5, biomarker_data.shape[1]))
-        components = pca.fit_transform(biomarker_data)
+        pca = self._fit_signature_pca(biomarker_data)
         
         # Create signature using top components
         signature_weights = pca.components_[0]  # First principal component
@@ -345,14 +491,19 @@ class AdvancedNOAnalytics:
             roc_auc = None
             optimal_cutoff = np.median(signature_scores)
         
+        # Strong predictors weigh more than the average biomarker in the signature
+        abs_weights = np.abs(signature_weights)
+        strong_predictors = biomarker_data.columns[abs_weights > abs_weights.mean()].tolist()
+        
         return {
-            'signature_weights': dict(zip(biomarker_data.columns, signature_weights)),
+            # Plain floats in one conversion rather than boxing a NumPy scalar per biomarker
+            'signature_weights': dict(zip(biomarker_data.columns.tolist(), signature_weights.tolist())),
             'variance_explained': pca.explained_variance_ratio_[0],
             'correlation_with_outcome': correlation,
             'roc_auc': roc_auc,
             'optimal_cutoff': optimal_cutoff,
             'signature_scores': signature_scores,
             'performance_summary': {
-                'strong_predictors': [col for col, weight in zip(biomarker_data.columns, np.abs(signature_weights)) if weight > np.mean(np.abs(signature_weights))]
+                'strong_predictors': strong_predictors
             }
         }
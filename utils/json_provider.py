@@ -0,0 +1,60 @@
+"""
+orjson-backed JSON provider for Flask, plus the matching column codec for SQLAlchemy
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Drop-in replacement for Flask's JSON provider using orjson
+
+    jsonify() and request.get_json() go through app.json, so installing this
+    provider speeds up every endpoint without touching the handlers. Compact
+    responses are encoded straight to bytes; anything orjson does not handle
+    natively (dates, Decimal, UUID, objects with __html__) goes through
+    Flask's own default() so the wire format stays the same.
+    """
+
+    def _options(self):
+        # Datetimes are passed through to default() to keep Flask's HTTP-date format
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string; formatting options fall back to the stdlib"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON from a string or bytes"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response, pretty-printed in debug mode like Flask's provider"""
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def orjson_dumps(obj):
+    """Serialize a JSON/JSONB column value; used as the engine's json_serializer"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+
+def orjson_loads(s):
+    """Deserialize a JSON/JSONB column value; used as the engine's json_deserializer"""
+    return orjson.loads(s)
@@ -1,48 +1,3 @@
-
-import logging
-import os
-from datetime import datetime
-
-def get_module_logger(module_name):
-    """Get a logger configured for a specific module"""
-    logger = logging.getLogger(module_name)
-    
-    # Set default level
-    logger.setLevel(logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    
-    # Create file handler
-    os.makedirs('logs', exist_ok=True)
-    today = datetime.now().strftime('%Y%m%d')
-    file_handler = logging.FileHandler(f'logs/nitrite_dynamics_{today}.log')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    
-    # Add handlers to logger if they haven't been added already
-    if not logger.handlers:
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
-    
-    return logger
-
-# Default application logger
-app_logger = get_module_logger('app')
-
-def log_exception(logger, exception, context=""):
-    """Log an exception with traceback and context"""
-    import traceback
-    error_msg = f"Exception during {context}: {str(exception)}"
-    logger.error(error_msg)
-    logger.error(traceback.format_exc())
-    return error_msg
-
 """
 Logger utility for Nitrite Dynamics application
 Provides consistent logging across the application
@@ -50,11 +5,105 @@ Provides consistent logging across the application
 import logging
 import os
 import sys
+import threading
+import time
 from datetime import datetime
+from logging.handlers import MemoryHandler, RotatingFileHandler
 
-# Create logs directory if it doesn't exist
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-os.makedirs(logs_dir, exist_ok=True)
+
+# One formatter and one pair of handlers serve every application logger. They are
+# built on first use, so looking up an already configured logger costs no
+# filesystem calls, and every logger writes through the same rotating file
+_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_handlers = None
+
+LOG_BUFFER_RECORDS = 512  # File records held in memory before a batched write
+LOG_FLUSH_INTERVAL = 5.0  # Seconds a buffered record can wait before it is written
+
+def _start_flusher(handler):
+    """Flush the buffered file handler every LOG_FLUSH_INTERVAL seconds"""
+    def flush_periodically():
+        while True:
+            time.sleep(LOG_FLUSH_INTERVAL)
+            handler.flush()
+    
+    threading.Thread(target=flush_periodically, name='log-flush', daemon=True).start()
+
+def _shared_handlers():
+    """Create the console and rotating file handlers once per process"""
+    global _handlers
+    if _handlers is not None:
+        return _handlers
+    
+    handlers = []
+    
+    # Console handler
+    try:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(_FORMATTER)
+        handlers.append(console_handler)
+    except Exception as console_err:
+        # If console handler fails, print but continue with file handler
+        print(f"Warning: Failed to set up console logger: {str(console_err)}")
+    
+    # File handler with error handling
+    try:
+        # Ensure logs directory exists
+        os.makedirs(logs_dir, exist_ok=True)
+        
+        # Create log filename with fallback if datetime fails
+        try:
+            date_part = datetime.now().strftime("%Y%m%d")
+        except:
+            # Fallback to simple timestamp if datetime fails
+            date_part = str(int(time.time()))
+        
+        log_file = os.path.join(logs_dir, f'nitrite_dynamics_{date_part}.log')
+        
+        # Create rotating file handler with proper permissions
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=10485760,  # 10MB
+            backupCount=5,
+            delay=True  # Only open file when first record is emitted
+        )
+        
+        # Set file permissions if on Unix (fails gracefully on Windows)
+        try:
+            import stat
+            os.chmod(log_file, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP)
+        except Exception:
+            pass  # Ignore permission errors
+        
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(_FORMATTER)
+        
+        # Batch file writes off the request path: records are queued and written
+        # together when the buffer fills, on any warning or error, every few
+        # seconds, and at interpreter exit (logging.shutdown closes the buffer,
+        # which flushes it). The timed flush bounds what a killed worker loses
+        buffered_handler = MemoryHandler(
+            capacity=LOG_BUFFER_RECORDS,
+            flushLevel=logging.WARNING,
+            target=file_handler,
+            flushOnClose=True
+        )
+        buffered_handler.setLevel(logging.DEBUG)
+        handlers.append(buffered_handler)
+        
+        _start_flusher(buffered_handler)
+        # Threads do not survive fork, so gunicorn workers forked from a
+        # --preload master need their own flusher
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=lambda: _start_flusher(buffered_handler))
+    except Exception as file_err:
+        # If file handler fails, log to console but don't crash
+        print(f"Warning: Failed to set up file logger: {str(file_err)}")
+    
+    _handlers = handlers
+    return _handlers
 
 # Configure logging
 def configure_logger(name=None):
@@ -64,70 +113,25 @@ def configure_logger(name=None):
         logger = logging.getLogger(logger_name)
         
         # Only configure logger once
-        if not logger.handlers:
-            logger.setLevel(logging.DEBUG)
-            
-            # Console handler
-            try:
-                console_handler = logging.StreamHandler(sys.stdout)
-                console_handler.setLevel(logging.INFO)
-                console_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                console_handler.setFormatter(console_format)
-                logger.addHandler(console_handler)
-            except Exception as console_err:
-                # If console handler fails, print but continue with file handler
-                print(f"Warning: Failed to set up console logger: {str(console_err)}")
-            
-            # File handler with error handling
+        if logger.handlers:
+            return logger
+        
+        logger.setLevel(logging.DEBUG)
+        for handler in _shared_handlers():
+            logger.addHandler(handler)
+        # The parent logger holds these same handlers; propagating would write every
+        # record from a module logger twice
+        logger.propagate = False
+        
+        # Add a safety wrapper to prevent logging errors from crashing the app
+        original_error = logger.error
+        def safe_error(msg, *args, **kwargs):
             try:
-                # Ensure logs directory exists
-                os.makedirs(logs_dir, exist_ok=True)
-                
-                # Create log filename with fallback if datetime fails
-                try:
-                    date_part = datetime.now().strftime("%Y%m%d")
-                except:
-                    # Fallback to simple timestamp if datetime fails
-                    date_part = str(int(time.time()))
-                
-                log_file = os.path.join(logs_dir, f'nitrite_dynamics_{date_part}.log')
-                
-                # Add log rotation to prevent large log files
-                from logging.handlers import RotatingFileHandler
-                
-                # Create rotating file handler with proper permissions
-                file_handler = RotatingFileHandler(
-                    log_file,
-                    maxBytes=10485760,  # 10MB
-                    backupCount=5,
-                    delay=True  # Only open file when first record is emitted
-                )
-                
-                # Set file permissions if on Unix (fails gracefully on Windows)
-                try:
-                    import stat
-                    os.chmod(log_file, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP)
-                except Exception:
-                    pass  # Ignore permission errors
-                
-                file_handler.setLevel(logging.DEBUG)
-                file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                file_handler.setFormatter(file_format)
-                
-                logger.addHandler(file_handler)
-            except Exception as file_err:
-                # If file handler fails, log to console but don't crash
-                print(f"Warning: Failed to set up file logger: {str(file_err)}")
-                
-            # Add a safety wrapper to prevent logging errors from crashing the app
-            original_error = logger.error
-            def safe_error(msg, *args, **kwargs):
-                try:
-                    return original_error(msg, *args, **kwargs)
-                except Exception as e:
-                    print(f"Error in logger.error: {str(e)}")
-                    print(f"Original message: {msg}")
-            logger.error = safe_error
+                return original_error(msg, *args, **kwargs)
+            except Exception as e:
+                print(f"Error in logger.error: {str(e)}")
+                print(f"Original message: {msg}")
+        logger.error = safe_error
         
         return logger
     except Exception as e:
@@ -138,8 +142,17 @@ def configure_logger(name=None):
             fallback_logger.addHandler(logging.StreamHandler(sys.stdout))
         return fallback_logger
 
-# Main application logger
-app_logger = configure_logger('nitrite_dynamics')
+# Main application logger, created on first use so that importing this module
+# does not touch the filesystem or build handlers
+def get_app_logger():
+    """Get the main application logger"""
+    return configure_logger('nitrite_dynamics')
+
+def __getattr__(name):
+    # Keeps `from utils.logger import app_logger` working without an import-time logger
+    if name == 'app_logger':
+        return get_app_logger()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Module-specific loggers
 def get_module_logger(module_name):
@@ -150,4 +163,4 @@ def get_module_logger(module_name):
 def log_exception(logger, e, context=None):
     """Log exception with detailed information"""
     context_info = f" while {context}" if context else ""
-    logger.error(f"Exception{context_info}: {type(e).__name__}: {str(e)}", exc_info=True)
\ No newline at end of file
+    logger.error(f"Exception{context_info}: {type(e).__name__}: {str(e)}", exc_info=True)
@@ -8,19 +8,26 @@ import numpy as np
 from matplotlib.patches import Rectangle
 from matplotlib.collections import LineCollection
 
+# Scientific color palette optimized for nitric oxide research
+colors = {
+    'primary': '#2E3440',      # Nord Polar Night
+    'no2': '#5E81AC',          # Nord Frost - for nitrite
+    'cgmp': '#A3BE8C',         # Nord Aurora Green - for cGMP
+    'vasodilation': '#81A1C1', # Nord Frost Light - for vasodilation
+    'background': '#ECEFF4',   # Nord Snow Storm
+    'grid': '#D8DEE9',         # Nord Snow Storm Medium
+    'text': '#2E3440',         # Nord Polar Night
+    'accent': '#BF616A'        # Nord Aurora Red
+}
+
+# The style lives in process-global rcParams, so applying it once is enough
+_style_configured = False
+
 def configure_mpl_style():
     """Configure matplotlib for publication-quality scientific plots"""
-    # Scientific color palette optimized for nitric oxide research
-    colors = {
-        'primary': '#2E3440',      # Nord Polar Night
-        'no2': '#5E81AC',          # Nord Frost - for nitrite
-        'cgmp': '#A3BE8C',         # Nord Aurora Green - for cGMP
-        'vasodilation': '#81A1C1', # Nord Frost Light - for vasodilation
-        'background': '#ECEFF4',   # Nord Snow Storm
-        'grid': '#D8DEE9',         # Nord Snow Storm Medium
-        'text': '#2E3440',         # Nord Polar Night
-        'accent': '#BF616A'        # Nord Aurora Red
-    }
+    global _style_configured
+    if _style_configured:
+        return colors
     
     # Set custom style parameters
     plt.style.use('seaborn-v0_8-whitegrid')
@@ -79,16 +86,19 @@ def configure_mpl_style():
         'savefig.edgecolor': 'none'
     })
     
+    _style_configured = True
     return colors
 
+# Horizontal Blues gradient behind filled curves, pre-rendered as a 1x100 RGBA
+# image so imshow skips normalisation and colormapping on every call
+_GRADIENT_RGBA = (plt.cm.Blues(np.linspace(0, 1, 100))[np.newaxis, :, :] * 255).astype(np.uint8)
+
 def create_gradient_fill(ax, x, y, color, alpha=0.3):
     """Create gradient fill under curve for enhanced visualization"""
-    # Create gradient
-    z = np.linspace(0, 1, 100).reshape(1, -1)
     extent = [x.min(), x.max(), 0, y.max()]
     
     # Plot gradient
-    ax.imshow(z, aspect='auto', cmap=plt.cm.Blues, alpha=alpha, extent=extent)
+    ax.imshow(_GRADIENT_RGBA, aspect='auto', alpha=alpha, extent=extent)
     
     # Add the actual line on top
     ax.plot(x, y, color=color, linewidth=2.5, zorder=10)
@@ -237,10 +247,9 @@ def create_heatmap_visualization(data, title="Dose-Response Heatmap",
 
 def add_significance_bars(ax, x1, x2, y, p_value, height_factor=0.05):
     """Add significance bars to plots"""
-    colors = configure_mpl_style()
-    
     # Get y-range for positioning
-    y_range = ax.get_ylim()[1] - ax.get_ylim()[0]
+    y_min, y_max = ax.get_ylim()
+    y_range = y_max - y_min
     bar_height = y + height_factor * y_range
     
     # Draw the bar
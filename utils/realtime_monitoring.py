@@ -3,20 +3,218 @@ Real-time Monitoring Module for N1O1 Clinical Trials
 Revolutionary real-time data streaming and alerting system
 """
 import asyncio
+import bisect
+import math
 import numpy as np
 from datetime import datetime, timedelta
 from collections import deque
 import json
-from typing import Dict, List, Callable, Optional
+from typing import Dict, List, Callable, Optional, Sequence
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Metric status by anomaly score: above the first bound is a warning, above the
+# second critical
+STATUS_LEVELS = np.array(['normal', 'warning', 'critical'])
+STATUS_BOUNDS = (0.5, 0.8)
+
+# Exact two-pass moments of a short window. Rings use it to resynchronise their
+# running statistics once per lap, so rounding error from the O(1) updates
+# cannot accumulate; event detectors use it on their trailing windows
+@njit(cache=True)
+def _window_moments(values, n):
+    """Mean and sum of squared deviations (M2) of values[:n]"""
+    total = 0.0
+    for i in range(n):
+        total += values[i]
+    mean = total / n
+    
+    m2 = 0.0
+    for i in range(n):
+        d = values[i] - mean
+        m2 += d * d
+    return mean, m2
+
+@njit(cache=True)
+def _first_peak(values):
+    """Index of the first strict local maximum, or -1 if there is none"""
+    for i in range(1, values.shape[0] - 1):
+        if values[i] > values[i - 1] and values[i] > values[i + 1]:
+            return i
+    return -1
+
+@njit(cache=True)
+def _non_increasing(values):
+    """Whether every value is less than or equal to the one before it"""
+    for i in range(1, values.shape[0]):
+        if not values[i] <= values[i - 1]:
+            return False
+    return True
+
+class MetricRing:
+    """
+    Fixed-size columnar buffer of one metric's samples
+    
+    Values and anomaly scores live in parallel float64 arrays written at a
+    wrapping head, so scans are contiguous and no per-sample dict is kept.
+    Timestamps are stored as the datetime objects given (naive or aware).
+    The ring also carries the running mean and M2 (Welford) of its values.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.values = np.empty(size, dtype=np.float64)
+        self.scores = np.empty(size, dtype=np.float64)
+        self.timestamps = np.empty(size, dtype=object)
+        self.head = 0  # Next write position
+        self.count = 0  # Samples held, at most size
+        self.mean = 0.0
+        self.m2 = 0.0
+        # True while every timestamp so far is no earlier than the one before,
+        # which lets time-range lookups binary-search the ring
+        self.time_ordered = True
+        self._latest_iso = None  # ISO string of the newest timestamp, built on request
+        
+    def __len__(self):
+        return self.count
+    
+    def push(self, value: float, anomaly_score: float, timestamp: datetime):
+        """Append a sample, overwriting the oldest when full, and update the statistics"""
+        value = float(value)
+        
+        if self.count < self.size:
+            # Welford's update while the window is still filling
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Full window: the new value replaces the oldest one in place
+            evicted = self.values[self.head]
+            new_mean = self.mean + (value - evicted) / self.count
+            self.m2 += (value - evicted) * (value - new_mean + evicted - self.mean)
+            self.mean = new_mean
+        
+        if self.time_ordered and self.count > 1:
+            try:
+                self.time_ordered = timestamp >= self.timestamps[(self.head - 1) % self.size]
+            except TypeError:  # Naive and aware datetimes mixed
+                self.time_ordered = False
+        
+        self.values[self.head] = value
+        self.scores[self.head] = anomaly_score
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.size
+        self._latest_iso = None
+        
+        # Resynchronise once per lap, and on every push while a NaN or inf is in
+        # the running sums: the O(1) update cannot remove one once it is evicted
+        if self.head == 0 or not (math.isfinite(self.mean) and math.isfinite(self.m2)):
+            self.mean, self.m2 = _window_moments(self.values, self.count)
+        self.m2 = max(self.m2, 0.0)
+    
+    def extend(self, values: np.ndarray, anomaly_scores: np.ndarray, timestamps: Sequence[datetime]):
+        """Append a batch of samples in order, then recompute the statistics once"""
+        stamps = np.empty(len(timestamps), dtype=object)
+        stamps[:] = timestamps
+        
+        if self.time_ordered:
+            try:
+                previous = self.timestamps[(self.head - 1) % self.size] if self.count else stamps[0]
+                self.time_ordered = bool(stamps[0] >= previous and (stamps[1:] >= stamps[:-1]).all())
+            except TypeError:  # Naive and aware datetimes mixed
+                self.time_ordered = False
+        
+        # Only the last `size` samples of an oversized batch survive the wrap
+        n = len(values)
+        keep = slice(max(n - self.size, 0), n)
+        positions = (self.head + np.arange(max(n - self.size, 0), n)) % self.size
+        self.values[positions] = values[keep]
+        self.scores[positions] = anomaly_scores[keep]
+        self.timestamps[positions] = stamps[keep]
+        self.head = (self.head + n) % self.size
+        self.count = min(self.count + n, self.size)
+        self._latest_iso = None
+        
+        # While filling, the samples occupy slots 0..count-1; once full, all of them
+        self.mean, self.m2 = _window_moments(self.values, self.count)
+    
+    def std(self) -> float:
+        """Population standard deviation of the buffered values"""
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+    
+    def positions(self, k: Optional[int] = None) -> np.ndarray:
+        """Array indices of the last k samples (default all) in arrival order"""
+        k = self.count if k is None else min(k, self.count)
+        return np.arange(self.head - k, self.head) % self.size
+    
+    def time_range(self, start_time: Optional[datetime] = None,
+                   end_time: Optional[datetime] = None) -> np.ndarray:
+        """Array indices, in arrival order, of samples stamped within [start_time, end_time]"""
+        positions = self.positions()
+        
+        if self.time_ordered:
+            # Arrival order is time order: bisect for the bounds and slice
+            stamp = self.timestamps.__getitem__
+            lo = bisect.bisect_left(positions, start_time, key=stamp) if start_time else 0
+            hi = bisect.bisect_right(positions, end_time, key=stamp) if end_time else len(positions)
+            return positions[lo:hi]
+        
+        if start_time:
+            positions = positions[self.timestamps[positions] >= start_time]
+        if end_time:
+            positions = positions[self.timestamps[positions] <= end_time]
+        return positions
+    
+    def _tail(self, column: np.ndarray, k: int) -> np.ndarray:
+        """Last k entries of a column in arrival order; a view unless they wrap"""
+        k = min(k, self.count)
+        if k <= self.head:
+            return column[self.head - k:self.head]
+        return np.concatenate((column[self.size - (k - self.head):], column[:self.head]))
+    
+    def tail_values(self, k: int) -> np.ndarray:
+        """The last k values in arrival order"""
+        return self._tail(self.values, k)
+    
+    def tail_scores(self, k: int) -> np.ndarray:
+        """The last k anomaly scores in arrival order"""
+        return self._tail(self.scores, k)
+    
+    def latest_isoformat(self) -> str:
+        """ISO 8601 form of the newest timestamp, formatted once per new sample"""
+        if self._latest_iso is None:
+            self._latest_iso = self.timestamps[(self.head - 1) % self.size].isoformat()
+        return self._latest_iso
+    
+    def point(self, position: int) -> Dict:
+        """Materialise one sample as the dict returned by the monitor's API"""
+        return {
+            'value': float(self.values[position]),
+            'timestamp': self.timestamps[position],
+            'anomaly_score': float(self.scores[position])
+        }
+
 
 class RealTimeMonitor:
     """Real-time monitoring system for clinical trial data"""
     
     def __init__(self, buffer_size: int = 1000):
         self.buffer_size = buffer_size
-        self.data_buffers = {}
+        self.data_buffers = {}  # MetricRing per metric
         self.alert_thresholds = {}
-        self.alert_callbacks = []
+        # (callback, is_async) in registration order, classified once when registered
+        self._alert_subscribers = []
         self.trend_analyzers = {}
         self.is_running = False
         
@@ -25,16 +223,21 @@ class RealTimeMonitor:
                    upper_threshold: Optional[float] = None,
                    trend_window: int = 100):
         """Add a metric to monitor with optional thresholds"""
-        self.data_buffers[metric_name] = deque(maxlen=self.buffer_size)
+        self.data_buffers[metric_name] = MetricRing(self.buffer_size)
         self.alert_thresholds[metric_name] = {
             'lower': lower_threshold,
             'upper': upper_threshold
         }
         self.trend_analyzers[metric_name] = TrendAnalyzer(window_size=trend_window)
         
+    @property
+    def alert_callbacks(self) -> tuple:
+        """Registered alert callbacks in order; add them with register_alert_callback"""
+        return tuple(callback for callback, _ in self._alert_subscribers)
+    
     def register_alert_callback(self, callback: Callable):
         """Register a callback function for alerts"""
-        self.alert_callbacks.append(callback)
+        self._alert_subscribers.append((callback, asyncio.iscoroutinefunction(callback)))
         
     async def process_data_point(self, metric_name: str, value: float, timestamp: Optional[datetime] = None):
         """Process a new data point for a metric"""
@@ -43,19 +246,11 @@ class RealTimeMonitor:
             
         timestamp = timestamp or datetime.now()
         
-        # Store data point
-        data_point = {
-            'value': value,
-            'timestamp': timestamp,
-            'anomaly_score': 0.0
-        }
-        
         # Check for anomalies
         anomaly_score = self._calculate_anomaly_score(metric_name, value)
-        data_point['anomaly_score'] = anomaly_score
         
         # Add to buffer
-        self.data_buffers[metric_name].append(data_point)
+        self.data_buffers[metric_name].push(value, anomaly_score, timestamp)
         
         # Check thresholds
         alerts = self._check_thresholds(metric_name, value)
@@ -78,19 +273,119 @@ class RealTimeMonitor:
             'alerts': alerts
         }
     
+    async def process_batch(self, metric_name: str, values: Sequence[float],
+                            timestamps: Optional[Sequence[datetime]] = None):
+        """
+        Process a burst of data points for a metric in one pass
+        
+        Gives the same anomaly scores, trend and alerts as feeding the values
+        through process_data_point one at a time: each sample is scored, and
+        checked for rapid-change and sustained-anomaly patterns, against the
+        window as it stood when that sample arrived. The windows come from
+        prefix sums over the buffered history followed by the batch, and alert
+        dicts are built only for the samples that raise one. Alert callbacks
+        run after the whole batch has been stored.
+        """
+        if metric_name not in self.data_buffers:
+            raise ValueError(f"Metric {metric_name} not registered")
+            
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return {'processed': 0, 'anomaly_scores': values, 'statuses': STATUS_LEVELS[:0],
+                    'trend': None, 'alerts': []}
+        if timestamps is None:
+            timestamps = [datetime.now()] * len(values)
+        elif len(timestamps) != len(values):
+            raise ValueError("values and timestamps must have the same length")
+            
+        ring = self.data_buffers[metric_name]
+        n = len(values)
+        h = len(ring)
+        
+        # Check for anomalies: sample i is scored against the last min(h + i, size)
+        # values of history + batch. Centring on the buffered mean keeps the
+        # prefix sums of squares well conditioned
+        shift = ring.mean if h and math.isfinite(ring.mean) else 0.0
+        history = np.concatenate((ring.tail_values(h), values))
+        seq = history - shift
+        sums = np.concatenate(([0.0], np.cumsum(seq)))
+        sq_sums = np.concatenate(([0.0], np.cumsum(seq * seq)))
+        ends = h + np.arange(n)
+        lengths = np.minimum(ends, ring.size)
+        scored = lengths >= 10
+        anomaly_scores = np.zeros(n)
+        if scored.any():
+            ends, lengths = ends[scored], lengths[scored]
+            means = (sums[ends] - sums[ends - lengths]) / lengths
+            stds = np.sqrt(np.maximum((sq_sums[ends] - sq_sums[ends - lengths]) / lengths - means * means, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_scores = np.abs(seq[ends] - means) / stds
+            anomaly_scores[scored] = np.where(stds > 0, np.minimum(z_scores / 4.0, 1.0), 0.0)
+        statuses = STATUS_LEVELS[(anomaly_scores > STATUS_BOUNDS[0]).astype(np.intp)
+                                 + (anomaly_scores > STATUS_BOUNDS[1])]
+        # Running count of high scores over history + batch, for the sustained check
+        high_counts = np.concatenate(([0], np.cumsum(np.concatenate((ring.tail_scores(h), anomaly_scores)) > 0.7)))
+        
+        # Add to buffer
+        ring.extend(values, anomaly_scores, timestamps)
+        
+        # Check thresholds, materialising alerts only where a bound is crossed
+        thresholds = self.alert_thresholds[metric_name]
+        breached = np.zeros(len(values), dtype=bool)
+        if thresholds['lower'] is not None:
+            breached |= values < thresholds['lower']
+        if thresholds['upper'] is not None:
+            breached |= values > thresholds['upper']
+        alerts_by_index = {int(i): self._check_thresholds(metric_name, values[i])
+                           for i in np.flatnonzero(breached)}
+        
+        # Analyze trends
+        trend_analyzer = self.trend_analyzers[metric_name]
+        trend_analyzer.extend(values[:-1])
+        trend_info = trend_analyzer.analyze(values[-1])
+        
+        # Check for critical patterns in the window after each sample, as
+        # _detect_critical_patterns does once the buffer holds 10 values
+        ends = h + np.arange(1, n + 1)
+        full = np.minimum(ends, ring.size) >= 10
+        if full.any():
+            ends = ends[full]
+            recent = np.lib.stride_tricks.sliding_window_view(history, 10)[ends - 10]
+            changes = np.abs(recent[:, -1] - recent[:, -5])
+            averages = recent.mean(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rapid = (averages > 0) & (changes / averages > 0.5)
+            sustained = high_counts[ends] - high_counts[ends - 5] == 5
+            for i, change, is_rapid, is_sustained in zip(np.flatnonzero(full), changes, rapid, sustained):
+                if is_rapid:
+                    alerts_by_index.setdefault(int(i), []).append(self._rapid_change_alert(metric_name, change))
+                if is_sustained:
+                    alerts_by_index.setdefault(int(i), []).append(self._sustained_anomaly_alert(metric_name))
+        
+        # Trigger alerts if any
+        alerts = []
+        for i in sorted(alerts_by_index):
+            await self._trigger_alerts(metric_name, float(values[i]), alerts_by_index[i], timestamps[i])
+            alerts.append({'index': i, 'value': float(values[i]), 'alerts': alerts_by_index[i]})
+            
+        return {
+            'processed': len(values),
+            'anomaly_scores': anomaly_scores,
+            'statuses': statuses,
+            'trend': trend_info,
+            'alerts': alerts
+        }
+    
     def _calculate_anomaly_score(self, metric_name: str, value: float) -> float:
         """Calculate anomaly score using statistical methods"""
-        buffer = self.data_buffers[metric_name]
+        ring = self.data_buffers[metric_name]
         
-        if len(buffer) < 10:
+        if len(ring) < 10:
             return 0.0
             
-        # Get recent values
-        recent_values = [dp['value'] for dp in buffer]
-        
         # Calculate statistics
-        mean = np.mean(recent_values)
-        std = np.std(recent_values)
+        mean = ring.mean
+        std = ring.std()
         
         if std == 0:
             return 0.0
@@ -127,35 +422,43 @@ class RealTimeMonitor:
     def _detect_critical_patterns(self, metric_name: str) -> List[Dict]:
         """Detect critical patterns in the data"""
         alerts = []
-        buffer = self.data_buffers[metric_name]
+        ring = self.data_buffers[metric_name]
         
-        if len(buffer) < 10:
+        if len(ring) < 10:
             return alerts
             
-        recent_values = [dp['value'] for dp in list(buffer)[-10:]]
+        recent_values = ring.tail_values(10)
         
         # Rapid change detection
         if len(recent_values) >= 5:
             recent_change = abs(recent_values[-1] - recent_values[-5])
-            avg_value = np.mean(recent_values)
+            avg_value = recent_values.mean()
             
             if avg_value > 0 and recent_change / avg_value > 0.5:  # 50% change
-                alerts.append({
-                    'type': 'rapid_change',
-                    'severity': 'medium',
-                    'message': f'Rapid change detected in {metric_name}: {recent_change:.2f} in 5 readings'
-                })
+                alerts.append(self._rapid_change_alert(metric_name, recent_change))
         
         # Sustained high/low detection
-        if all(dp['anomaly_score'] > 0.7 for dp in list(buffer)[-5:]):
-            alerts.append({
-                'type': 'sustained_anomaly',
-                'severity': 'high',
-                'message': f'Sustained anomaly in {metric_name}'
-            })
+        if (ring.tail_scores(5) > 0.7).all():
+            alerts.append(self._sustained_anomaly_alert(metric_name))
             
         return alerts
     
+    def _rapid_change_alert(self, metric_name: str, recent_change: float) -> Dict:
+        """Alert for a value that moved more than 50% of the recent average in 5 readings"""
+        return {
+            'type': 'rapid_change',
+            'severity': 'medium',
+            'message': f'Rapid change detected in {metric_name}: {recent_change:.2f} in 5 readings'
+        }
+    
+    def _sustained_anomaly_alert(self, metric_name: str) -> Dict:
+        """Alert for five consecutive readings with a high anomaly score"""
+        return {
+            'type': 'sustained_anomaly',
+            'severity': 'high',
+            'message': f'Sustained anomaly in {metric_name}'
+        }
+    
     async def _trigger_alerts(self, metric_name: str, value: float, 
                             alerts: List[Dict], timestamp: datetime):
         """Trigger alert callbacks"""
@@ -166,10 +469,10 @@ class RealTimeMonitor:
             'alerts': alerts
         }
         
-        # Call all registered callbacks
-        for callback in self.alert_callbacks:
+        # Call all registered callbacks in registration order
+        for callback, is_async in self._alert_subscribers:
             try:
-                if asyncio.iscoroutinefunction(callback):
+                if is_async:
                     await callback(alert_data)
                 else:
                     callback(alert_data)
@@ -180,20 +483,20 @@ class RealTimeMonitor:
         """Get current status of all monitored metrics"""
         status = {}
         
-        for metric_name, buffer in self.data_buffers.items():
-            if len(buffer) == 0:
+        for metric_name, ring in self.data_buffers.items():
+            if len(ring) == 0:
                 status[metric_name] = {
                     'current_value': None,
                     'status': 'no_data'
                 }
                 continue
                 
-            latest = buffer[-1]
-            recent_values = [dp['value'] for dp in list(buffer)[-10:]]
+            latest = ring.point((ring.head - 1) % ring.size)
+            recent_values = ring.tail_values(10)
             
             status[metric_name] = {
                 'current_value': latest['value'],
-                'timestamp': latest['timestamp'].isoformat(),
+                'timestamp': ring.latest_isoformat(),
                 'anomaly_score': latest['anomaly_score'],
                 'trend': self.trend_analyzers[metric_name].get_trend(),
                 'statistics': {
@@ -209,9 +512,9 @@ class RealTimeMonitor:
     
     def _get_metric_status(self, metric_name: str, latest_point: Dict) -> str:
         """Determine overall status of a metric"""
-        if latest_point['anomaly_score'] > 0.8:
+        if latest_point['anomaly_score'] > STATUS_BOUNDS[1]:
             return 'critical'
-        elif latest_point['anomaly_score'] > 0.5:
+        elif latest_point['anomaly_score'] > STATUS_BOUNDS[0]:
             return 'warning'
         else:
             return 'normal'
@@ -223,16 +526,13 @@ class RealTimeMonitor:
         if metric_name not in self.data_buffers:
             return []
             
-        buffer = self.data_buffers[metric_name]
-        data = list(buffer)
+        ring = self.data_buffers[metric_name]
         
         # Filter by time if specified
-        if start_time:
-            data = [dp for dp in data if dp['timestamp'] >= start_time]
-        if end_time:
-            data = [dp for dp in data if dp['timestamp'] <= end_time]
+        positions = ring.time_range(start_time, end_time)
             
-        return data
+        # Dicts are built only here, at the API boundary
+        return [ring.point(position) for position in positions]
 
 
 class TrendAnalyzer:
@@ -241,27 +541,67 @@ class TrendAnalyzer:
     def __init__(self, window_size: int = 100):
         self.window_size = window_size
         self.values = deque(maxlen=window_size)
+        # Running least-squares state over the window, with x = 0..n-1: the mean
+        # and Welford M2 of y, and sum(x * y). Updated in O(1) per sample and
+        # recomputed exactly once per window length so rounding cannot drift
+        self._mean_y = 0.0
+        self._m2_y = 0.0
+        self._sum_xy = 0.0
+        self._updates = 0
+        
+    def _append(self, value: float):
+        """Add a value to the window and update the running fit state"""
+        value = float(value)
+        n = len(self.values)
+        
+        if n < self.window_size:
+            self._sum_xy += n * value
+            n += 1
+            delta = value - self._mean_y
+            self._mean_y += delta / n
+            self._m2_y += delta * (value - self._mean_y)
+        else:
+            # Dropping the oldest value shifts every x down by one, which takes
+            # the remaining sum of y off sum(x * y); the new value lands at n - 1
+            evicted = self.values[0]
+            self._sum_xy += (n - 1) * value - (self._mean_y * n - evicted)
+            new_mean = self._mean_y + (value - evicted) / n
+            self._m2_y += (value - evicted) * (value - new_mean + evicted - self._mean_y)
+            self._mean_y = new_mean
+        
+        self.values.append(value)
+        self._updates += 1
+        if self._updates % self.window_size == 0:
+            y = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+            self._mean_y = y.mean()
+            self._m2_y = float(np.dot(y - self._mean_y, y - self._mean_y))
+            self._sum_xy = float(np.dot(np.arange(len(y)), y))
+        
+    def extend(self, values: Sequence[float]):
+        """Add values to the window without analysing each one"""
+        for value in values:
+            self._append(value)
         
     def analyze(self, value: float) -> Dict:
         """Analyze trend with new value"""
-        self.values.append(value)
+        self._append(value)
+        n = len(self.values)
         
-        if len(self.values) < 3:
+        if n < 3:
             return {'trend': 'insufficient_data', 'strength': 0.0}
             
-        # Calculate trend using linear regression
-        x = np.arange(len(self.values))
-        y = np.array(self.values)
-        
-        # Fit linear trend
-        coeffs = np.polyfit(x, y, 1)
-        slope = coeffs[0]
-        
-        # Calculate R-squared for trend strength
-        y_pred = np.polyval(coeffs, x)
-        ss_res = np.sum((y - y_pred) ** 2)
-        ss_tot = np.sum((y - np.mean(y)) ** 2)
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
+        # Linear regression in closed form: x is 0..n-1, so its mean and sum of
+        # squared deviations are fixed by n
+        x_mean = (n - 1) / 2
+        sxx = n * (n * n - 1) / 12
+        sxy = self._sum_xy - n * x_mean * self._mean_y
+        slope = sxy / sxx
+        intercept = self._mean_y - slope * x_mean
+        
+        # R-squared for trend strength; for a least-squares line it is the
+        # explained share sxy² / (sxx * ss_tot)
+        ss_tot = self._m2_y
+        r_squared = min(sxy * sxy / (sxx * ss_tot), 1.0) if ss_tot > 0 else 0
         
         # Determine trend direction
         if abs(slope) < 0.001:
@@ -275,13 +615,13 @@ class TrendAnalyzer:
             'trend': trend,
             'slope': slope,
             'strength': abs(r_squared),
-            'prediction': self._predict_next(coeffs)
+            'prediction': self._predict_next(slope, intercept)
         }
     
-    def _predict_next(self, coeffs: np.ndarray) -> float:
+    def _predict_next(self, slope: float, intercept: float) -> float:
         """Predict next value based on trend"""
         next_x = len(self.values)
-        return float(np.polyval(coeffs, next_x))
+        return float(slope * next_x + intercept)
     
     def get_trend(self) -> str:
         """Get current trend direction"""
@@ -326,7 +666,7 @@ class ClinicalEventDetector:
         bp_values = metric_data['blood_pressure'][-10:]
         
         # Check for sustained decrease
-        if all(bp_values[i] <= bp_values[i-1] for i in range(1, len(bp_values))):
+        if _non_increasing(np.asarray(bp_values, dtype=np.float64)):
             decrease = bp_values[0] - bp_values[-1]
             if decrease > 5:  # 5 mmHg decrease
                 return {
@@ -345,13 +685,13 @@ class ClinicalEventDetector:
         values = metric_data['no2_concentration']
         
         # Simple peak detection
-        for i in range(1, len(values) - 1):
-            if values[i] > values[i-1] and values[i] > values[i+1]:
-                return {
-                    'peak_value': values[i],
-                    'peak_index': i,
-                    'confirmed': True
-                }
+        i = int(_first_peak(np.asarray(values, dtype=np.float64)))
+        if i >= 0:
+            return {
+                'peak_value': values[i],
+                'peak_index': i,
+                'confirmed': True
+            }
                 
         return None
     
@@ -360,15 +700,16 @@ class ClinicalEventDetector:
         if 'no2_concentration' not in metric_data or len(metric_data['no2_concentration']) < 20:
             return None
             
-        values = metric_data['no2_concentration'][-20:]
+        values = np.asarray(metric_data['no2_concentration'][-20:], dtype=np.float64)
         
-        # Check coefficient of variation
-        cv = np.std(values) / np.mean(values) if np.mean(values) > 0 else 1.0
+        # Check coefficient of variation; mean and SD come from one compiled pass
+        mean, m2 = _window_moments(values, len(values))
+        cv = (m2 / len(values)) ** 0.5 / mean if mean > 0 else 1.0
         
         if cv < 0.1:  # Less than 10% variation
             return {
                 'achieved': True,
-                'mean_level': np.mean(values),
+                'mean_level': mean,
                 'cv': cv
             }
             
@@ -380,13 +721,13 @@ class ClinicalEventDetector:
         
         # Check multiple metrics for adverse patterns
         if 'heart_rate' in metric_data and len(metric_data['heart_rate']) > 5:
-            hr_values = metric_data['heart_rate'][-5:]
-            if any(hr > 100 or hr < 50 for hr in hr_values):
+            hr_values = np.asarray(metric_data['heart_rate'][-5:], dtype=np.float64)
+            if ((hr_values > 100) | (hr_values < 50)).any():
                 alerts.append('abnormal_heart_rate')
                 
         if 'blood_pressure' in metric_data and len(metric_data['blood_pressure']) > 5:
-            bp_values = metric_data['blood_pressure'][-5:]
-            if any(bp < 90 for bp in bp_values):
+            bp_values = np.asarray(metric_data['blood_pressure'][-5:], dtype=np.float64)
+            if (bp_values < 90).any():
                 alerts.append('hypotension')
                 
         if alerts: